@@ -0,0 +1,34 @@
+# memory held by the spell catalog: NormalizedSpell dataclasses vs SpellRecords
+# run from the repo root: python -m benchmarks.memory_benchmark [spells.json]
+import gc
+import json
+import sys
+import tracemalloc
+
+from src.orchestration import spell_objects_from_JSON
+
+SPELLS_JSON: str = "src/data/FINAL_spells.json"
+
+
+def retained_bytes(database: list, compact: bool):
+    # what the spells dict keeps alive once built, JSON source excluded
+    gc.collect()
+    tracemalloc.start()
+    spells: dict = spell_objects_from_JSON(database, compact=compact)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, len(spells)
+
+
+if __name__ == "__main__":
+    path: str = sys.argv[1] if len(sys.argv) > 1 else SPELLS_JSON
+    with open(file=path, mode="r") as spell_JSON:
+        database: list = json.load(spell_JSON)
+
+    normalized, count = retained_bytes(database, compact=False)
+    compact, _ = retained_bytes(database, compact=True)
+    print(f"{'representation':<20}{'total (KiB)':>14}{'per spell (B)':>16}")
+    for name, size in (("NormalizedSpell", normalized), ("SpellRecord", compact)):
+        print(f"{name:<20}{size / 1024:>14.1f}{size / count:>16.0f}")
+    print(f"{count} spells, SpellRecord saves {1 - compact / normalized:.0%}")
@@ -0,0 +1,76 @@
+# compares the hand-written query lexer with the regex it replaced
+# run from the repo root: python -m benchmarks.parsing_benchmark
+import re
+import timeit
+
+from src.search.query_handler import ParsedQuery, QueryParsing
+
+LEGACY_PARSING_PATTERN = r"""(?x)
+        (-)?(\w+)([<>=:-]+)\(([^)]+)\)|# -dt:(fire cold)
+        (-)?(\w+)([<>=:-]+)([^\s()]+)|# -dt:fire
+        ([-*])(\w+)|# NOT and ANY applicable fields
+        (-)?(\w+)# name search
+        """
+LEGACY_PARSING_REGEX: re.Pattern = re.compile(LEGACY_PARSING_PATTERN)
+
+
+def legacy_parse_query(query: str):
+    parsed_inputs: list = []
+    for match in LEGACY_PARSING_REGEX.finditer(query):
+        if match.group(2):
+            m_ = "NOT" if match.group(1) == "-" else ""
+            parsed_inputs.append(
+                ParsedQuery(
+                    match.group(2).lower(), match.group(3), match.group(4).split(), m_
+                )
+            )
+        elif match.group(6):
+            m_ = "NOT" if match.group(5) == "-" else ""
+            parsed_inputs.append(
+                ParsedQuery(
+                    match.group(6).lower(), match.group(7), match.group(8).split(), m_
+                )
+            )
+        elif match.group(10):
+            m_ = "ANY" if match.group(9) == "*" else "NOT"
+            parsed_inputs.append(ParsedQuery(match.group(10), ":", None, m_))
+        else:
+            m_ = "NOT" if match.group(11) == "-" else ""
+            parsed_inputs.append(ParsedQuery("spell_name", ":", [match.group(12)], m_))
+    return parsed_inputs
+
+
+QUERIES: dict = {
+    "short": "level:3 dt:fire",
+    "typical": "-dt:(fire cold) *st -conc l>=3 rg<=60 cls:wizard bolt",
+    "pasted": " ".join(
+        ["level:3 dt:(fire cold acid) -conc *st rg>=60 dur<3600 magic missile"] * 40
+    ),
+    # one long word: every regex alternative rescans it before giving up
+    "long word": "a" * 3000,
+}
+
+
+def _same_clauses(query: str):
+    legacy = [
+        (p.field, p.operator, p.values, p.modifier) for p in legacy_parse_query(query)
+    ]
+    lexer = [
+        (p.field, p.operator, p.values, p.modifier)
+        for p in QueryParsing(query).parse_query()
+    ]
+    return legacy == lexer
+
+
+if __name__ == "__main__":
+    print(f"{'query':<12}{'chars':>7}{'regex (us)':>14}{'lexer (us)':>14}  same output")
+    for name, query in QUERIES.items():
+        runs: int = 2000 if len(query) < 200 else 50
+        regex_time = timeit.timeit(lambda: legacy_parse_query(query), number=runs)
+        lexer_time = timeit.timeit(
+            lambda: QueryParsing(query).parse_query(), number=runs
+        )
+        print(
+            f"{name:<12}{len(query):>7}{regex_time / runs * 1e6:>14.1f}"
+            f"{lexer_time / runs * 1e6:>14.1f}  {_same_clauses(query)}"
+        )
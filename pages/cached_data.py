@@ -1,16 +1,33 @@
 import streamlit as st
-import json
 
-from src.orchestration import spell_objects_from_JSON, create_indices
+from src.orchestration import load_spells, load_spells_and_indices
+from src.search.mapped_handler import MAPPED_PATH, open_mapped_catalog
+from src.search.snapshot_handler import SNAPSHOT_PATH, SPELLS_JSON
+
+
+@st.cache_resource
+def initialize_mapped_indices():
+    # a resource, not data: cache_data would copy the arrays out of the mapping
+    return open_mapped_catalog(MAPPED_PATH, SPELLS_JSON)
+
+
+@st.cache_data
+def initialize_spells():
+    # just the spell records; the indices are the mapped ones
+    return load_spells(SPELLS_JSON, SNAPSHOT_PATH)
 
 
 @st.cache_data
 def initialize_spells_and_indices():
-    with open(file="src/data/FINAL_spells.json", mode="r") as spell_JSON:
-        spell_source = json.load(spell_JSON)
-    spells: dict = spell_objects_from_JSON(spell_source)
-    indices: dict = create_indices(spells)
+    # prebuilt snapshot (see snapshot_handler) if current, else the JSON path
+    spells, indices = load_spells_and_indices(SPELLS_JSON, SNAPSHOT_PATH)
     return spells, indices
 
 
-SPELLS, INDICES = initialize_spells_and_indices()
+# workers share one mapped catalog (see mapped_handler); each only builds or
+# unpickles its own indices when there's none to map
+INDICES = initialize_mapped_indices()
+if INDICES is None:
+    SPELLS, INDICES = initialize_spells_and_indices()
+else:
+    SPELLS = initialize_spells()
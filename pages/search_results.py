@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import uuid
 
-from src.orchestration import orchestrate_search
+from src.orchestration import orchestrate_autocomplete, orchestrate_search
 from pages.cached_data import SPELLS, INDICES
 from pages.analytics import (
     track_search,
@@ -24,6 +24,11 @@ if "selected_spell" not in st.session_state:
 if "view_mode" not in st.session_state:
     st.session_state.view_mode = "grid"
 
+# results shown per page, "Show more" adds another page
+PAGE_SIZE: int = 50
+if "result_limit" not in st.session_state:
+    st.session_state.result_limit = PAGE_SIZE
+
 st.title("search results")
 
 ## searching functions
@@ -48,18 +53,35 @@ st.text_input(
 
 query = st.session_state.get("search_input_widget", "")
 
+# a new query starts back at the first page
+if st.session_state.get("last_query") != query:
+    st.session_state.last_query = query
+    st.session_state.result_limit = PAGE_SIZE
+
 ## search processing
-results = set()
+results = []
+total = 0
+facets = {}
+plan = None
 df = pd.DataFrame()
 
 if query:
     try:
-        results: set = orchestrate_search(query, SPELLS, INDICES)
+        # sorted by spell name, unless the query has order:<field>
+        search = orchestrate_search(
+            query,
+            SPELLS,
+            INDICES,
+            facets=True,
+            limit=st.session_state.result_limit,
+        )
+        results, total, facets = search["results"], search["total"], search["facets"]
+        plan = search.get("explain")
     except Exception as e:
         st.error(f"An error occurred: {type(e).__name__}: {str(e)}")
     else:
         if results:
-            track_search(query, result_count=len(results))
+            track_search(query, result_count=total)
         data: list = [SPELLS[name].__dict__ for name in results]
         df = pd.DataFrame(data=data, columns=["name", "level", "school"])
 
@@ -67,6 +89,24 @@ if query:
 ## display helpers
 
 
+def display_suggestions(query):
+    # completions for the last term, e.g. "dt:fi" -> "dt:fire", as one-click queries
+    suggestions = [
+        suggestion
+        for suggestion in orchestrate_autocomplete(query, INDICES, limit=4)
+        if suggestion["query"] != query
+    ]
+    if not suggestions:
+        return
+    st.caption("Did you mean:")
+    for col, suggestion in zip(st.columns(len(suggestions)), suggestions):
+        with col:
+            label = f"{suggestion['query']} ({suggestion['count']})"
+            if st.button(label, key=f"suggestion_{suggestion['query']}"):
+                st.session_state.query = suggestion["query"]
+                st.rerun()
+
+
 def display_handler(spell):
     st.subheader(f"**{spell.name}** _(Level {spell.level} {spell.school})_")
     st.write(f"""**Casting Time:** {spell.casting_time}  
@@ -94,13 +134,30 @@ def display_handler(spell):
 
 ## display logic
 
+# explain:true, how the query ran, clause by clause
+if plan:
+    st.subheader("query plan")
+    st.dataframe(pd.DataFrame(plan["clauses"]), hide_index=True, width="stretch")
+    st.caption(
+        " | ".join(f"{step}: {ms} ms" for step, ms in plan["timings_ms"].items())
+    )
+
 if query and not results:
     st.warning(f"no matches for '{query}'")
+    display_suggestions(query)
 elif results:
-    if len(results) == 1:
+    if total == 1:
         st.success(f"Found 1 match for query '{query}'")
     else:
-        st.success(f"Found {len(results)} matches for query '{query}'")
+        st.success(f"Found {total} matches for query '{query}'")
+    # result counts per value, instead of re-querying level:1, level:2...
+    with st.expander("Result breakdown"):
+        facet_cols = st.columns(len(facets))
+        for col, (field, counts) in zip(facet_cols, facets.items()):
+            with col:
+                st.markdown(f"**{field.replace('_', ' ')}**")
+                for value, count in counts.items():
+                    st.caption(f"{value}: {count}")
 
 # table view
 table_view = st.toggle(label="Show as table (select spells for additional detail)")
@@ -131,11 +188,15 @@ if table_view:
 
 # basic view
 else:
-    sorted_results = sorted(list(results))
     col1, col2 = st.columns(2)
-    for num, name in enumerate(sorted(results)):
+    for num, name in enumerate(results):
         with col1 if num % 2 == 0 else col2:
             display_handler(SPELLS[name])
 
+if len(results) < total:
+    st.caption(f"Showing {len(results)} of {total} matches")
+    if st.button("Show more"):
+        st.session_state.result_limit += PAGE_SIZE
+        st.rerun()
 
 st.page_link("pages/home.py", label="**[<] Back to search**")
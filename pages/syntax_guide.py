@@ -88,12 +88,39 @@ for badges in OR_examples:
 st.caption("""No matches on the first one, no 3rd level spells deal **BOTH** fire
 **AND** lightning damage. The second one searches for fire **OR** lightning damage, so match!""")
 
+st.markdown("""To combine whole terms, join them with `OR` and group them with `( )`. Terms next
+to each other are matched first, so `level:1 dt:fire OR level:2` means "1st level fire spells, or
+any 2nd level spell". A :violet-badge[-] in front of a group negates all of it. Only uppercase `OR`
+joins terms; a lowercase "or" is just a word, so spell names like `create or destroy water` work.""")
+
+clickables(
+    [
+        ("violet", "(level:1 dt:fire OR level:2 dt:cold)"),
+        ("blue", "-(conc:yes OR r:yes)"),
+    ],
+    "Low level fire or cold spells that need neither concentration nor a ritual.",
+)
+
+st.markdown("""Results are listed by name. To **sort** them by a numeric field instead, add
+:violet-badge[order:<field>], and :violet-badge[dir:desc] for highest first. Spells without a
+value for that field (e.g., a special or unlimited range) always go last. Spells that deal no
+damage count as 0 damage, so they come first in :violet-badge[order:dmax].""")
+
+clickables(
+    [("orange", "dt:fire"), ("violet", "order:dmax"), ("violet", "dir:desc")],
+    "Fire spells, hardest hitting first.",
+)
+
+st.markdown("""Curious why a search is slow or comes back empty? Add :violet-badge[explain:true]
+to see each term's strategy, how many spells it matched and how long it took.""")
+
 col1, col2 = st.columns([2, 1])
 with col1:
     st.markdown("""**Operators are a big part of the magic.** All searchable fields accept
 equality operators (:violet-badge[:]). Numeric fields also accept comparison operators (:violet-badge[>], :violet-badge[>=],
-:violet-badge[<], or :violet-badge[<=]).  
-                
+:violet-badge[<], or :violet-badge[<=]), and numeric and text fields accept a not-equal operator
+(:violet-badge[-]), e.g. :violet-badge[level-0] for anything but cantrips.
+
 Most values have been worked on to allow custom comparisons you wouldn't expect, such as range and
 casting time between different time and D&D units.""")
 with col2:
@@ -202,7 +229,12 @@ always as digits (e.g., `3`, not `three`).
 higher slots. Accepts only `true`/`false` (or `yes`/`no`) as values.
 
 **Description:** :blue-badge[description] or :blue-badge[desc]. Search for specific text within a spell's 
-description. Perfect for finding spells with specific mechanics or effects mentioned in their text.""")
+description. Perfect for finding spells with specific mechanics or effects mentioned in their text.
+Wrap words in quotes to search for them as a phrase, e.g. :blue-badge[desc:"difficult terrain"].
+Quoted words are whole words: :blue-badge[desc:fire] also finds "fireball", :blue-badge[desc:"fire"] doesn't.
+For anything fancier, both name and description take a regex between slashes, e.g.
+:blue-badge[desc:/\\d+d\\d+ fire/] (case insensitive). A regex that runs too long is
+stopped, with a hint to make it more specific.""")
 
 with st.expander("**Targeting and effects**"):
     st.markdown("""
@@ -281,6 +313,10 @@ EXAMPLE_SEARCHES = [
         [("blue", "desc:invisible"), ("red", "school:illusion")],
         "Illusion spells dealing with invisibility",
     ),
+    (
+        [("blue", 'desc:"saving throw"'), ("violet", "level:0")],
+        "Cantrips that force a saving throw, phrase and all",
+    ),
     # Level
     (
         [("violet", "level:0"), ("yellow", "up:yes")],
@@ -1,66 +1,278 @@
 import json
-from collections import defaultdict
+import re
+import sys
+import time
+from collections import Counter
 
 # initializes spell objects and indices
-from src.specs.schema import NormalizedSpell
+from src.specs.schema import NormalizedSpell, SpellRecord
+import src.specs.units as units
 from src.search import SEARCH_FIELDS
 
-from src.search.query_handler import ParsedQuery, QueryParsing
-from src.search.command_handler import CommandValidation, SearchCommand
-from src.search.search_handler import SearchExecution
+from src.search.query_handler import QueryParsing
+from src.search.command_handler import (
+    SORT_FIELDS,
+    SearchExpression,
+    SortCommand,
+    compose_directives,
+    compose_expression,
+)
+from src.search.plan_handler import QueryExplaining, QueryPlanning
+from src.search.cache_handler import QueryCache, canonical_key
+from src.search.suggest_handler import QuerySuggestions
+from src.search.snapshot_handler import read_snapshot
+from src.search.index_handler import (
+    NumericRangeIndex,
+    SpellCatalog,
+    TokenIndex,
+)
 
 
-def spell_objects_from_JSON(database: list):
-    spells: dict[str, NormalizedSpell] = {}
+def spell_objects_from_JSON(database: list, compact: bool = True):
+    """Spells by name, as SpellRecords (or NormalizedSpells with compact=False)."""
+    spells: dict[str, SpellRecord | NormalizedSpell] = {}
     for sp in database:
         spell: NormalizedSpell = NormalizedSpell(
             name=sp["name"],
             level=sp["level"],
             concentration=sp["concentration"],
             ritual=sp["ritual"],
-            school=sp["school"],
-            range=sp["range"],
-            components=sp["components"],
-            duration=sp["duration"],
-            casting_time=sp["casting_time"],
-            classes=sp["classes"],
+            school=interned(sp["school"]),
+            range=interned(sp["range"]),
+            components=interned(sp["components"]),
+            duration=interned(sp["duration"]),
+            casting_time=interned(sp["casting_time"]),
+            classes=interned(sp["classes"]),
             higher_level=sp["higher_level"],
             higher_description=sp["higher_description"],
             description=sp["description"],
             url=sp["url"],
             srd_flag=sp["srd_flag"],
-            tags=sp["tags"],
+            tags=interned(sp["tags"]),
         )
-        spells[spell.name] = spell
+        spells[spell.name] = SpellRecord.from_spell(spell) if compact else spell
     return spells
 
 
+def interned(value):
+    # schools, classes, damage types, units... repeat across spells, so every
+    # spell (and index key) shares one string instead of its own copy
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [interned(v) for v in value]
+    if isinstance(value, dict):
+        return {interned(k): interned(v) for k, v in value.items()}
+    return value
+
+
+def load_spells_and_indices(json_path: str, snapshot_path: str):
+    """From the prebuilt snapshot when it's current, else from the spell JSON."""
+    loaded: tuple | None = read_snapshot(snapshot_path, json_path)
+    if loaded is not None:
+        return loaded
+    spells: dict = read_spells_JSON(json_path)
+    return spells, create_indices(spells)
+
+
+def load_spells(json_path: str, snapshot_path: str):
+    """Only the spells, for when the indices come from elsewhere (see mapped_handler)."""
+    loaded: tuple | None = read_snapshot(snapshot_path, json_path, with_indices=False)
+    if loaded is not None:
+        return loaded[0]
+    return read_spells_JSON(json_path)
+
+
+def read_spells_JSON(json_path: str):
+    with open(file=json_path, mode="r") as spell_JSON:
+        return spell_objects_from_JSON(json.load(spell_JSON))
+
+
 def create_indices(spells: dict):
-    indices: dict = {
-        field.name: defaultdict(set)
-        for field in SEARCH_FIELDS
-        if field.name != "spell_name"
-    } | {"spell_name": set()}
+    indices: SpellCatalog = SpellCatalog(
+        names=spells.keys(),
+        fields=[field.name for field in SEARCH_FIELDS if field.name != "spell_name"],
+    )
     for spell_name, spell_obj in spells.items():
-        indices["spell_name"].add(spell_name)
-        info = spell_obj.extract_index_info()
-        for k, v in info.items():
-            for value in v:
-                indices[k][value].add(spell_name)
+        indices.index_spell(spell_name, spell_obj.extract_index_info())
+    indices.descriptions = TokenIndex.from_texts(
+        [spells[name].description_text for name in indices.names]
+    )
+    # sorted keys for range searches (e.g., range>=60, dur<3600)
+    indices.numeric_ranges = {
+        field.name: NumericRangeIndex.from_postings(indices.postings[field.name])
+        for field in SEARCH_FIELDS
+        if field.operator is units.NumericOp
+    }
+    # presorted spell IDs for order:<field> (names are already in ID order)
+    indices.sort_orders = {
+        (field, descending): indices.columns.sort_order(field, descending)
+        for field in SORT_FIELDS - {"spell_name"}
+        for descending in (False, True)
+    }
     return indices
 
 
 # search engine
-def orchestrate_search(query: str, spells: dict, indices: dict):
-    parsed_queries: list[ParsedQuery] = QueryParsing(query).parse_query()
-    if not parsed_queries:
-        raise ValueError(
-            f"Could not parse query: '{query}'. Please review our syntax guide!"
-        )
-    results: list = []
-    for p_q in parsed_queries:
-        command: SearchCommand = CommandValidation(parsed_query=p_q).compose_command()
-        execution_process: SearchExecution = SearchExecution(command, spells, indices)
-        pre_result: set = execution_process.execute()
-        results.append(execution_process.applying_NOT_ANY_modifier(pre_result))
-    return set.intersection(*results)
+QUERY_CACHE: QueryCache = QueryCache(maxsize=1024)
+# fields the results page breaks results down by
+FACET_FIELDS: list = ["level", "school", "classes", "damage_type", "condition"]
+# raw query -> (cache key, expression, sort, explain), or the error it raised
+PARSE_CACHE: QueryCache = QueryCache(maxsize=4096)
+# typeahead index, rebuilt with fresh counts whenever the catalog version changes
+SUGGESTION_CACHE: QueryCache = QueryCache(maxsize=1)
+# the term being typed: whatever follows the last space or "("
+LAST_TERM: re.Pattern = re.compile(r"[^\s(]*$")
+
+
+def compile_query(query: str):
+    compiled: tuple | str | None = PARSE_CACHE.get(query)
+    if compiled is None:
+        try:
+            parsed_queries: list = QueryParsing(query).parse_query()
+            if not parsed_queries:
+                raise ValueError(
+                    f"Could not parse query: '{query}'. Please review our syntax guide!"
+                )
+            search_items, sort, explain = compose_directives(parsed_queries)
+            expression: SearchExpression = compose_expression(search_items)
+            compiled = (canonical_key(expression), expression, sort, explain)
+        except ValueError as e:
+            compiled = str(e)
+        PARSE_CACHE.put(query, None, compiled)
+    if isinstance(compiled, str):
+        raise ValueError(compiled)
+    return compiled
+
+
+def orchestrate_search(
+    query: str,
+    spells: dict,
+    indices: SpellCatalog,
+    evaluated: dict | None = None,
+    facets: bool = False,
+    offset: int = 0,
+    limit: int | None = None,
+):
+    """Matching spell names, in order:/dir: order (default: by name), paginated.
+
+    With facets=True, returns a dict with the page ("results"), the total number
+    of matches and facet counts over all of them. Queries with explain:true get
+    the same dict, plus the plan that ran (see explain_query).
+    """
+    cache_key, expression, sort, explain = compile_query(query)
+    cached: tuple | None = QUERY_CACHE.get(cache_key, indices.version)
+    if cached is None:
+        planning: QueryPlanning = QueryPlanning(expression, spells, indices, evaluated)
+        bitmap: int = planning.run()
+        cached = (indices.decode(bitmap), bitmap)
+        QUERY_CACHE.put(cache_key, indices.version, cached)
+
+    names, bitmap = cached
+    results: list = _page(names, bitmap, sort, indices, offset, limit)
+    if not (facets or explain):
+        return results
+    search: dict = {"results": results, "total": len(names)}
+    if facets:
+        search["facets"] = indices.facet_counts(bitmap, FACET_FIELDS)
+    if explain:
+        search["explain"] = explain_query(query, spells, indices)
+    return search
+
+
+def explain_query(query: str, spells: dict, indices: SpellCatalog):
+    """The plan for a query, run uncached: per-clause strategy, index structures
+    read, spell counts in and out, and wall times (ms) for each step."""
+    started: float = time.perf_counter()
+    parsed_queries: list = QueryParsing(query).parse_query()
+    parsed: float = time.perf_counter()
+    search_items, _, _ = compose_directives(parsed_queries)
+    expression: SearchExpression = compose_expression(search_items)
+    validated: float = time.perf_counter()
+
+    planning: QueryExplaining = QueryExplaining(expression, spells, indices)
+    bitmap: int = planning.run()
+    timings: dict = {
+        "parse": (parsed - started) * 1000,
+        "validate": (validated - parsed) * 1000,
+        **planning.timings,
+        "total": (time.perf_counter() - started) * 1000,
+    }
+    return {
+        "clauses": planning.clauses,
+        "timings_ms": {step: round(ms, 3) for step, ms in timings.items()},
+        "results": bitmap.bit_count(),
+    }
+
+
+def _page(names, bitmap, sort: SortCommand, indices, offset: int, limit):
+    if sort.field != "spell_name":
+        return indices.page(bitmap, sort.field, sort.descending, offset, limit)
+    ordered: list = names[::-1] if sort.descending else names
+    return ordered[offset : None if limit is None else offset + limit]
+
+
+def orchestrate_batch(queries: list[str], spells: dict, indices: SpellCatalog):
+    """Runs many queries at once; results in input order, with per-query errors."""
+    # clauses shared by several queries (e.g., class:wizard) are evaluated once,
+    # against the whole catalog, and reused by every query that has them
+    commands: dict = {}
+    clause_counts: Counter = Counter()
+    for query in set(queries):
+        try:
+            _, expression, _, _ = compile_query(query)
+        except ValueError:
+            continue
+        query_commands: dict = {
+            canonical_key(command): command for command in expression.commands()
+        }
+        commands |= query_commands
+        clause_counts.update(query_commands.keys())
+    evaluated: dict = {}
+    shared: QueryPlanning = QueryPlanning(None, spells, indices, evaluated)
+    for key, count in clause_counts.items():
+        if count > 1:
+            try:
+                shared.evaluate(commands[key], indices.universe)
+            except ValueError:
+                # e.g. a regex timeout; not pre-warmed, each query runs it again
+                # and reports its own error
+                continue
+
+    batch: list[dict] = []
+    for query in queries:
+        try:
+            results: list = orchestrate_search(query, spells, indices, evaluated)
+        except ValueError as e:
+            # query errors (parsing, validation, regex timeouts); bugs propagate
+            batch.append(
+                {"query": query, "results": [], "error": f"{type(e).__name__}: {e}"}
+            )
+        else:
+            batch.append({"query": query, "results": results, "error": None})
+    return batch
+
+
+def orchestrate_autocomplete(text: str, indices: SpellCatalog, limit: int = 8):
+    """Completions for the last term of a partial query, e.g. "l:3 dt:fi".
+
+    Returns plain dicts (full query, completed term, match count, kind), so the
+    result can go straight to a Streamlit widget or a JSON response.
+    """
+    suggestions: QuerySuggestions | None = SUGGESTION_CACHE.get(
+        "suggestions", indices.version
+    )
+    if suggestions is None:
+        suggestions = QuerySuggestions(indices, SEARCH_FIELDS)
+        SUGGESTION_CACHE.put("suggestions", indices.version, suggestions)
+
+    term_start: int = LAST_TERM.search(text).start()
+    return [
+        {
+            "query": text[:term_start] + suggestion.term,
+            "term": suggestion.term,
+            "count": suggestion.count,
+            "kind": suggestion.kind,
+        }
+        for suggestion in suggestions.suggest(text[term_start:], limit)
+    ]
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+from src.search.command_handler import SearchCommand
+
+
+def canonical_key(node):
+    """Same key for equivalent queries, e.g. "l:3 dt:fire" and "dt:fire level:3"."""
+    # commands are validated, so aliases and value spellings are already resolved
+    if isinstance(node, SearchCommand):
+        return (
+            node.field,
+            str(node.operator),
+            node.modifier or "",
+            tuple(sorted(node.values, key=repr)),
+        )
+    keys: set = {canonical_key(operand) for operand in node.operands}
+    if len(keys) == 1 and not node.modifier:
+        return keys.pop()
+    return (node.operator, node.modifier, tuple(sorted(keys, key=repr)))
+
+
+# process-wide LRU, dropped whenever the version (e.g., catalog version) changes
+class QueryCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize: int = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.version: int | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version: int | None = None):
+        with self._lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, version: int | None, result):
+        with self._lock:
+            if version != self.version:
+                return
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "version": self.version,
+        }
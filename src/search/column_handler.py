@@ -0,0 +1,104 @@
+import bisect
+import operator
+
+import numpy as np
+
+import src.specs.units as units
+
+# scalar fields stored one array per field, aligned to spell IDs
+NUMERIC_COLUMNS: tuple = (
+    "level",
+    "range",
+    "gp_cost",
+    "duration",
+    "casting_time",
+    "damage_average",
+    "damage_maximum",
+)
+BOOLEAN_COLUMNS: tuple = ("concentration", "ritual", "upcast")
+
+COMPARISONS: dict = {
+    units.NumericOp.GT_E: operator.ge,
+    units.NumericOp.GT: operator.gt,
+    units.NumericOp.LT_E: operator.le,
+    units.NumericOp.LT: operator.lt,
+}
+
+
+class SpellColumns:
+    def __init__(self, size: int):
+        self.size: int = size
+        # null (e.g., no range tag) is NaN, so it never matches a comparison
+        self.columns: dict[str, np.ndarray] = {
+            field: np.full(size, np.nan) for field in NUMERIC_COLUMNS
+        } | {field: np.zeros(size, dtype=bool) for field in BOOLEAN_COLUMNS}
+
+    def set_row(self, spell_id: int, index_info: dict):
+        for field, column in self.columns.items():
+            value = next(iter(index_info[field]), None)
+            if field in BOOLEAN_COLUMNS:
+                column[spell_id] = value is True
+                continue
+            try:
+                column[spell_id] = float(value)
+            except (ValueError, TypeError):
+                column[spell_id] = np.nan
+
+    def clear_row(self, spell_id: int):
+        for field, column in self.columns.items():
+            column[spell_id] = False if field in BOOLEAN_COLUMNS else np.nan
+
+    def grow(self, size: int):
+        for field, column in self.columns.items():
+            fill = False if field in BOOLEAN_COLUMNS else np.nan
+            padding: np.ndarray = np.full(size - self.size, fill, dtype=column.dtype)
+            self.columns[field] = np.concatenate((column, padding))
+        self.size = size
+
+    def __contains__(self, field: str):
+        return field in self.columns
+
+    def equal(self, field: str, values: list):
+        return np.isin(self.columns[field], values)
+
+    def not_equal(self, field: str, values: list):
+        column: np.ndarray = self.columns[field]
+        return ~np.isnan(column) & ~np.isin(column, values)
+
+    def compare(self, field: str, op: str, target: float):
+        return COMPARISONS[op](self.columns[field], target)
+
+    def nothing(self):
+        return np.zeros(self.size, dtype=bool)
+
+    def sort_order(self, field: str, descending: bool = False):
+        # spell IDs by value, ties by ID (i.e., name); NaN (null) always last
+        column: np.ndarray = self.columns[field]
+        return np.lexsort((np.arange(self.size), -column if descending else column))
+
+    def reorder(
+        self, order: np.ndarray, field: str, descending: bool, spell_id: int, names
+    ):
+        """Moves one spell to its place in a sort_order() after its row changed."""
+        order = order[order != spell_id]
+        column: np.ndarray = self.columns[field]
+        keys: np.ndarray = (-column if descending else column)[order]
+        value: float = -column[spell_id] if descending else column[spell_id]
+        low: int = np.searchsorted(keys, value, side="left")
+        high: int = np.searchsorted(keys, value, side="right")
+        # ties by name, as in sort_order() while IDs are in name order
+        position: int = low + bisect.bisect(
+            order[low:high], names[spell_id], key=names.__getitem__
+        )
+        return np.concatenate((order[:position], [spell_id], order[position:]))
+
+    def from_bitmap(self, bitmap: int):
+        packed = np.frombuffer(
+            bitmap.to_bytes((self.size + 7) // 8, "little"), np.uint8
+        )
+        return np.unpackbits(packed, count=self.size, bitorder="little").astype(bool)
+
+    @staticmethod
+    def to_bitmap(mask: np.ndarray):
+        # bit i of the result is mask[i], same layout as the posting lists
+        return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
@@ -1,21 +1,133 @@
 from enum import StrEnum
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 
 import src.specs.units as units
 from src.search import FIELD_BY_ALIAS, NAME, DESCRIPTION
-from src.search.query_handler import ParsedQuery
+from src.search.query_handler import ParsedGroup, ParsedQuery, unquoted
+from src.search.column_handler import NUMERIC_COLUMNS
+from src.search.regex_handler import REGEX_FIELDS, compile_regex, is_regex
 from src.specs.schema import SearchField
 
+# order:<field> accepts names and single-valued numeric fields
+SORT_FIELDS: set = {NAME.name, *NUMERIC_COLUMNS}
+# terms about how results are returned, rather than which spells match
+DIRECTIVES: tuple = ("order", "dir", "explain")
 
-@dataclass
+
+@dataclass(frozen=True)
 class SearchCommand:
     field: str
     operator: str
-    values: set
+    values: frozenset
     rules: SearchField
     modifier: str | None = field(default=None)
 
 
+# AND/OR over commands and nested expressions; modifier "NOT" negates the group
+@dataclass(frozen=True)
+class SearchExpression:
+    operator: str
+    operands: tuple
+    modifier: str = ""
+
+    def commands(self):
+        for operand in self.operands:
+            if isinstance(operand, SearchExpression):
+                yield from operand.commands()
+            else:
+                yield operand
+
+
+def compose_expression(parsed_items: list, operator: str = "AND", modifier: str = ""):
+    operands: list = []
+    for item in parsed_items:
+        if isinstance(item, ParsedGroup):
+            operands.append(
+                compose_expression(item.items, item.operator, item.modifier)
+            )
+        else:
+            operands.append(CommandValidation(parsed_query=item).compose_command())
+    return SearchExpression(
+        operator=operator, operands=tuple(operands), modifier=modifier
+    )
+
+
+@dataclass(frozen=True)
+class SortCommand:
+    field: str = NAME.name
+    descending: bool = False
+
+
+def compose_directives(parsed_items: list):
+    """Splits order:/dir:/explain: terms from the search terms.
+
+    Directives apply to the whole query, also from inside a top-level "OR":
+    "l:1 OR l:2 order:level" parses as l:1 OR (l:2 order:level).
+    """
+    search_items, directives = _split_directives(parsed_items)
+    if (
+        len(search_items) == 1
+        and isinstance(search_items[0], ParsedGroup)
+        and search_items[0].operator == "OR"
+        and not search_items[0].modifier
+    ):
+        search_items, found = _split_or_directives(search_items[0])
+        directives += found
+
+    field_name: str = NAME.name
+    descending: bool = False
+    explain: bool = False
+    for item in directives:
+        if item.operator != ":" or len(item.values or []) != 1:
+            raise ValueError(f"'{item.field}' takes a single value, e.g. order:level")
+        value: str = unquoted(item.values[0]).lower()
+        if item.field == "explain":
+            if value not in ("true", "false"):
+                raise ValueError(f"'{value}' is not valid for explain, use true")
+            explain = value == "true"
+            continue
+        if item.field == "dir":
+            if value not in ("asc", "desc"):
+                raise ValueError(f"'{value}' is not a valid direction, use asc or desc")
+            descending = value == "desc"
+            continue
+        sort_field = FIELD_BY_ALIAS.get(value)
+        if sort_field is None or sort_field.name not in SORT_FIELDS:
+            raise ValueError(f"Can't order results by '{value}'")
+        field_name = sort_field.name
+    return search_items, SortCommand(field=field_name, descending=descending), explain
+
+
+def _split_directives(items: list):
+    search_items: list = []
+    directives: list = []
+    for item in items:
+        if isinstance(item, ParsedQuery) and item.field in DIRECTIVES:
+            directives.append(item)
+        else:
+            search_items.append(item)
+    return search_items, directives
+
+
+def _split_or_directives(group: ParsedGroup):
+    # each branch is a single term or an AND group of the terms around an "OR"
+    branches: list = []
+    directives: list = []
+    for branch in group.items:
+        if isinstance(branch, ParsedGroup) and not branch.modifier:
+            items, found = _split_directives(branch.items)
+            branch = items[0] if len(items) == 1 else replace(branch, items=items)
+        else:
+            items, found = _split_directives([branch])
+        directives += found
+        if items:
+            branches.append(branch)
+    if len(branches) < 2:
+        # e.g. "l:1 OR order:level", nothing left to OR
+        return branches, directives
+    return [replace(group, items=branches)], directives
+
+
 class CommandValidation:
     def __init__(self, parsed_query: ParsedQuery):
         self.field: str = parsed_query.field
@@ -41,12 +153,23 @@ class CommandValidation:
             )
         return True
 
+    def validate_modifier(self):
+        if self.modifier == "ANY" and not self.field_rules.not_any:
+            raise ValueError(
+                f"'*' modifier incompatible with '{self.field_rules.name}' searches"
+            )
+        return True
+
     def validate_values(self):
         validated_values = set()
         # in case of modifiers
         if self.values is None:
             return set()
         for value in self.values:
+            # only descriptions tell "fire" (whole word) from fire (also fireball);
+            # names and field values search the same either way
+            if self.field_rules is not DESCRIPTION:
+                value = unquoted(value)
             match self.field_rules.operator:
                 case units.NumericOp:
                     try:
@@ -56,7 +179,7 @@ class CommandValidation:
                             raise ValueError(
                                 f"'{value}' is not a valid number for '{self.field}'"
                             )
-                        val_check = value
+                        val_check = value.lower()
                 case units.BooleanOp:
                     lower_val = value.lower()
                     if lower_val in ("true", "yes"):
@@ -67,6 +190,12 @@ class CommandValidation:
                         raise ValueError(
                             f"'{value}' is not a valid value for '{self.field}'"
                         )
+                case units.TextOp if is_regex(value):
+                    if self.field_rules.name not in REGEX_FIELDS:
+                        raise ValueError(
+                            "Regex searches only work for names and descriptions"
+                        )
+                    val_check = compile_regex(value)
                 case units.TextOp:
                     val_check = value.lower()
                 case _:
@@ -96,10 +225,11 @@ class CommandValidation:
     def compose_command(self):
         valid_values: set = self.validate_values()
         self.validate_operator()
+        self.validate_modifier()
         return SearchCommand(
             field=self.field_rules.name.lower(),
             operator=self.operator,
-            values=valid_values,
+            values=frozenset(valid_values),
             rules=self.field_rules,
             modifier=self.modifier,
         )
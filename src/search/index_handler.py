@@ -0,0 +1,474 @@
+import re
+import bisect
+import itertools
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from src.search.column_handler import SpellColumns
+from src.search.query_handler import is_phrase, unquoted
+from src.search.regex_handler import required_literals, search_texts
+from src.search.substring_handler import MATCHER_MIN_VALUES, matcher
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# every catalog gets its own version, so caches can tell catalogs apart
+CATALOG_VERSIONS = itertools.count(1)
+
+
+def bitmap_ids(bitmap: int):
+    """Spell IDs set in a bitmap, in ascending order."""
+    return [i for i, bit in enumerate(reversed(bin(bitmap))) if bit == "1"]
+
+
+def regex_scan(pattern: re.Pattern, texts: list[str], candidates: int, deadline):
+    # the actual regex, only on spells that made it through an index prefilter
+    spell_ids: list[int] = bitmap_ids(candidates)
+    if not spell_ids:
+        return 0
+    timeout = None if deadline is None else deadline - time.perf_counter()
+    bitmap: int = 0
+    for i in search_texts(
+        pattern, [texts[spell_id] for spell_id in spell_ids], timeout
+    ):
+        bitmap |= 1 << spell_ids[i]
+    return bitmap
+
+
+# sorted keys for numeric fields, so range searches don't scan every key
+@dataclass
+class NumericRangeIndex:
+    keys: list[float]
+    # prefix[i] holds every spell with a key in keys[:i], suffix[i] in keys[i:]
+    prefix: list[int]
+    suffix: list[int]
+
+    @classmethod
+    def from_postings(cls, postings: dict):
+        merged: dict[float, int] = {}
+        for k, bitmap in postings.items():
+            try:
+                numeric_k = float(k)
+            except (ValueError, TypeError):
+                continue
+            merged[numeric_k] = merged.get(numeric_k, 0) | bitmap
+        keys: list[float] = sorted(merged)
+
+        prefix: list[int] = [0]
+        for k in keys:
+            prefix.append(prefix[-1] | merged[k])
+        suffix: list[int] = [0]
+        for k in reversed(keys):
+            suffix.append(suffix[-1] | merged[k])
+        suffix.reverse()
+        return cls(keys=keys, prefix=prefix, suffix=suffix)
+
+    def add(self, key, bit: int):
+        try:
+            numeric_k = float(key)
+        except (ValueError, TypeError):
+            return
+        i: int = bisect.bisect_left(self.keys, numeric_k)
+        if i == len(self.keys) or self.keys[i] != numeric_k:
+            self.keys.insert(i, numeric_k)
+            self.prefix.insert(i + 1, self.prefix[i])
+            self.suffix.insert(i, self.suffix[i])
+        for j in range(i + 1, len(self.prefix)):
+            self.prefix[j] |= bit
+        for j in range(i + 1):
+            self.suffix[j] |= bit
+
+    def discard(self, bit: int):
+        # emptied keys stay, they match nothing and keep prefix/suffix aligned
+        self.prefix = [bitmap & ~bit for bitmap in self.prefix]
+        self.suffix = [bitmap & ~bit for bitmap in self.suffix]
+
+    def below(self, target: float, inclusive: bool = False):
+        if inclusive:
+            return self.prefix[bisect.bisect_right(self.keys, target)]
+        return self.prefix[bisect.bisect_left(self.keys, target)]
+
+    def above(self, target: float, inclusive: bool = False):
+        if inclusive:
+            return self.suffix[bisect.bisect_left(self.keys, target)]
+        return self.suffix[bisect.bisect_right(self.keys, target)]
+
+
+# inverted index over normalized description text; positions per spell ID are
+# bitmaps too, bit p set if the token is the p-th word of the description
+@dataclass
+class TokenIndex:
+    texts: list[str]
+    postings: dict[str, int]
+    positions: dict[str, dict[int, int]]
+
+    @classmethod
+    def from_texts(cls, texts: list[str]):
+        postings: dict[str, int] = defaultdict(int)
+        positions: dict[str, dict[int, int]] = defaultdict(dict)
+        for spell_id, text in enumerate(texts):
+            for position, token in enumerate(TOKEN_PATTERN.findall(text)):
+                postings[token] |= 1 << spell_id
+                positions[token][spell_id] = (
+                    positions[token].get(spell_id, 0) | 1 << position
+                )
+        return cls(texts=texts, postings=dict(postings), positions=dict(positions))
+
+    def add(self, spell_id: int, text: str):
+        if spell_id == len(self.texts):
+            self.texts.append(text)
+        else:
+            self.texts[spell_id] = text
+        for position, token in enumerate(TOKEN_PATTERN.findall(text)):
+            self.postings[token] = self.postings.get(token, 0) | 1 << spell_id
+            token_positions: dict = self.positions.setdefault(token, {})
+            token_positions[spell_id] = token_positions.get(spell_id, 0) | 1 << position
+
+    def remove(self, spell_id: int):
+        for token in set(TOKEN_PATTERN.findall(self.texts[spell_id])):
+            self.postings[token] &= ~(1 << spell_id)
+            del self.positions[token][spell_id]
+            if not self.postings[token]:
+                del self.postings[token], self.positions[token]
+        self.texts[spell_id] = ""
+
+    def search(self, values, candidates: int | None = None, deadline=None):
+        # many words, e.g. desc:(fire cold acid ...): one vocabulary pass for all
+        words: set = {
+            word
+            for value in values
+            if isinstance(value, str)
+            for word in TOKEN_PATTERN.findall(value)
+        }
+        contained: dict | None = (
+            self.containing_all(words) if len(words) >= MATCHER_MIN_VALUES else None
+        )
+        bitmap: int = 0
+        for value in values:
+            if isinstance(value, re.Pattern):
+                bitmap |= self.regex(value, candidates, deadline)
+            else:
+                bitmap |= self.match(value, candidates, contained)
+        return bitmap
+
+    def match(
+        self, value: str, candidates: int | None = None, contained: dict | None = None
+    ):
+        if candidates is None:
+            candidates = (1 << len(self.texts)) - 1
+        if is_phrase(value):
+            value = unquoted(value)
+            words: list[str] = TOKEN_PATTERN.findall(value)
+            # quoted: whole words in sequence, "fire" doesn't match fireball
+            if words:
+                return self.phrase(words, candidates)
+        else:
+            words = TOKEN_PATTERN.findall(value)
+            if words == [value]:
+                return self._containing(value, contained) & candidates
+        # punctuation in the value: narrow down by its words, then verify
+        candidates = self.narrow(value, candidates, contained)
+        bitmap: int = 0
+        for spell_id in bitmap_ids(candidates):
+            if value in self.texts[spell_id]:
+                bitmap |= 1 << spell_id
+        return bitmap
+
+    def narrow(self, value: str, candidates: int, contained: dict | None = None):
+        # every spell whose text could contain value, from its (partial) words
+        for word in TOKEN_PATTERN.findall(value):
+            candidates &= self._containing(word, contained)
+        return candidates
+
+    def regex(self, pattern: re.Pattern, candidates: int | None = None, deadline=None):
+        if candidates is None:
+            candidates = (1 << len(self.texts)) - 1
+        for literal in required_literals(pattern):
+            candidates = self.narrow(literal, candidates)
+        return regex_scan(pattern, self.texts, candidates, deadline)
+
+    def phrase(self, words: list[str], candidates: int):
+        # quoted phrases: whole words, each one position after the one before
+        for word in words:
+            candidates &= self.postings.get(word, 0)
+            if not candidates:
+                return 0
+        bitmap: int = 0
+        positions: list = [self.positions[word] for word in words]
+        for spell_id in bitmap_ids(candidates):
+            # positions where the phrase starts: shift each word back by its offset
+            starts: int = positions[0][spell_id]
+            for offset, word_positions in enumerate(positions[1:], start=1):
+                starts &= word_positions[spell_id] >> offset
+            if starts:
+                bitmap |= 1 << spell_id
+        return bitmap
+
+    def containing(self, word: str):
+        # whole word is a single lookup; partial words (e.g., "dark" in
+        # "darkness") only scan the vocabulary, never the descriptions
+        bitmap: int = self.postings.get(word, 0)
+        for token in self.postings:
+            if word in token and token != word:
+                bitmap |= self.postings[token]
+        return bitmap
+
+    def containing_all(self, words):
+        # containing() for every word at once, one automaton pass over the vocabulary
+        contained: dict[str, int] = {word: self.postings.get(word, 0) for word in words}
+        tokens: list[str] = list(self.postings)
+        for i, found in matcher(words).find_each(tokens):
+            token_bitmap: int = self.postings[tokens[i]]
+            for word in found:
+                contained[word] |= token_bitmap
+        return contained
+
+    def _containing(self, word: str, contained: dict | None):
+        if contained is not None and word in contained:
+            return contained[word]
+        return self.containing(word)
+
+    def estimate(self, values):
+        # rarest whole word in each value; partial words count as the whole catalog
+        estimate: int = 0
+        for value in values:
+            if isinstance(value, re.Pattern):
+                estimate += len(self.texts)
+                continue
+            estimate += min(
+                (
+                    self.postings[word].bit_count()
+                    for word in TOKEN_PATTERN.findall(value)
+                    if word in self.postings
+                ),
+                default=len(self.texts),
+            )
+        return estimate
+
+
+# n-gram index over lowercased spell names, for substring name searches
+@dataclass
+class TrigramIndex:
+    texts: list[str]
+    trigrams: dict[str, int]
+    # every 1 and 2 character substring, for values too short to have trigrams
+    short_grams: dict[str, int]
+
+    @classmethod
+    def from_texts(cls, texts: list[str]):
+        index = cls(texts=[], trigrams={}, short_grams={})
+        for spell_id, text in enumerate(texts):
+            index.add(spell_id, text)
+        return index
+
+    def grams(self, text: str):
+        for n, grams in (
+            (1, self.short_grams),
+            (2, self.short_grams),
+            (3, self.trigrams),
+        ):
+            for i in range(len(text) - n + 1):
+                yield grams, text[i : i + n]
+
+    def add(self, spell_id: int, text: str):
+        if spell_id == len(self.texts):
+            self.texts.append(text)
+        else:
+            self.texts[spell_id] = text
+        for grams, gram in self.grams(text):
+            grams[gram] = grams.get(gram, 0) | 1 << spell_id
+
+    def remove(self, spell_id: int):
+        for grams, gram in self.grams(self.texts[spell_id]):
+            grams[gram] &= ~(1 << spell_id)
+            if not grams[gram]:
+                del grams[gram]
+        self.texts[spell_id] = ""
+
+    def search(self, values, candidates: int | None = None, deadline=None):
+        bitmap: int = 0
+        for value in values:
+            if isinstance(value, re.Pattern):
+                bitmap |= self.regex(value, candidates, deadline)
+            else:
+                bitmap |= self.match(value, candidates)
+        return bitmap
+
+    def match(self, value: str, candidates: int | None = None):
+        if candidates is None:
+            candidates = (1 << len(self.texts)) - 1
+        if len(value) < 3:
+            return self.short_grams.get(value, 0) & candidates
+        for i in range(len(value) - 2):
+            candidates &= self.trigrams.get(value[i : i + 3], 0)
+            if not candidates:
+                return 0
+        # sharing every trigram does not guarantee a substring match, so verify
+        bitmap: int = 0
+        for spell_id in bitmap_ids(candidates):
+            if value in self.texts[spell_id]:
+                bitmap |= 1 << spell_id
+        return bitmap
+
+    def regex(self, pattern: re.Pattern, candidates: int | None = None, deadline=None):
+        if candidates is None:
+            candidates = (1 << len(self.texts)) - 1
+        for literal in required_literals(pattern):
+            candidates = self.match(literal, candidates)
+        return regex_scan(pattern, self.texts, candidates, deadline)
+
+    def estimate(self, values):
+        # rarest n-gram in each value
+        estimate: int = 0
+        for value in values:
+            if isinstance(value, re.Pattern):
+                estimate += len(self.texts)
+                continue
+            if len(value) < 3:
+                estimate += self.short_grams.get(value, 0).bit_count()
+                continue
+            estimate += min(
+                self.trigrams.get(value[i : i + 3], 0).bit_count()
+                for i in range(len(value) - 2)
+            )
+        return estimate
+
+
+# spell IDs and bitmap posting lists; bit i is set if spell names[i] matches.
+# IDs start out in name order; add() appends, remove() leaves an unused ID behind
+class SpellCatalog:
+    def __init__(self, names, fields):
+        self.names: list[str] = sorted(names)
+        self.ids: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.universe: int = (1 << len(self.names)) - 1
+        # false once add() appends a name out of order, then decode() has to sort
+        self.in_name_order: bool = True
+        self.version: int = next(CATALOG_VERSIONS)
+        self.postings: dict[str, dict] = {field: defaultdict(int) for field in fields}
+        # every spell with at least one indexed value per field, for NOT and ANY
+        self.any_values: dict[str, int] = {field: 0 for field in fields}
+        # same, leaving out null values (e.g., no range tag), for not-equal searches
+        self.populated: dict[str, int] = {field: 0 for field in fields}
+        # indexed values per spell ID, so a spell can be taken out of its postings
+        self.index_infos: dict[int, dict] = {}
+        self.numeric_ranges: dict[str, NumericRangeIndex] = {}
+        self.columns: SpellColumns = SpellColumns(len(self.names))
+        # (field, descending) -> spell IDs in that order, for order:<field>
+        self.sort_orders: dict = {}
+        self.descriptions: TokenIndex = TokenIndex.from_texts([])
+        self.name_grams: TrigramIndex = TrigramIndex.from_texts(
+            [name.lower() for name in self.names]
+        )
+
+    def index_spell(self, name: str, index_info: dict):
+        bit: int = 1 << self.ids[name]
+        for k, v in index_info.items():
+            for value in v:
+                self.postings[k][value] |= bit
+                self.any_values[k] |= bit
+                if value is not None:
+                    self.populated[k] |= bit
+        self.index_infos[self.ids[name]] = index_info
+        self.columns.set_row(self.ids[name], index_info)
+
+    def add(self, spell):
+        """Indexes a new spell without a rebuild, under the next unused ID."""
+        if spell.name in self.ids:
+            raise ValueError(f"'{spell.name}' is already indexed")
+        self.in_name_order = self.in_name_order and spell.name > max(
+            self.ids, default=""
+        )
+        spell_id: int = len(self.names)
+        self.names.append(spell.name)
+        self.ids[spell.name] = spell_id
+        self.universe |= 1 << spell_id
+        self.columns.grow(len(self.names))
+        self._index(spell_id, spell)
+
+    def remove(self, name: str):
+        if name not in self.ids:
+            raise ValueError(f"'{name}' is not indexed")
+        spell_id: int = self.ids.pop(name)
+        self._unindex(spell_id)
+        self.names[spell_id] = None
+        self.universe &= ~(1 << spell_id)
+        for key, order in self.sort_orders.items():
+            self.sort_orders[key] = order[order != spell_id]
+        self.version = next(CATALOG_VERSIONS)
+
+    def update(self, spell):
+        """Reindexes a changed spell (e.g., a data correction) under its own ID."""
+        if spell.name not in self.ids:
+            raise ValueError(f"'{spell.name}' is not indexed")
+        spell_id: int = self.ids[spell.name]
+        self._unindex(spell_id)
+        self._index(spell_id, spell)
+
+    def _index(self, spell_id: int, spell):
+        index_info: dict = spell.extract_index_info()
+        self.index_spell(spell.name, index_info)
+        self.descriptions.add(spell_id, spell.description_text)
+        self.name_grams.add(spell_id, spell.name_lower)
+        for field, ranges in self.numeric_ranges.items():
+            for value in index_info[field]:
+                ranges.add(value, 1 << spell_id)
+        for (field, descending), order in self.sort_orders.items():
+            self.sort_orders[(field, descending)] = self.columns.reorder(
+                order, field, descending, spell_id, self.names
+            )
+        # new version, so cached results for the old catalog are dropped
+        self.version = next(CATALOG_VERSIONS)
+
+    def _unindex(self, spell_id: int):
+        bit: int = 1 << spell_id
+        for k, v in self.index_infos.pop(spell_id).items():
+            for value in v:
+                self.postings[k][value] &= ~bit
+                if not self.postings[k][value]:
+                    del self.postings[k][value]
+            self.any_values[k] &= ~bit
+            self.populated[k] &= ~bit
+        self.columns.clear_row(spell_id)
+        self.descriptions.remove(spell_id)
+        self.name_grams.remove(spell_id)
+        for ranges in self.numeric_ranges.values():
+            ranges.discard(bit)
+
+    def lookup(self, field: str, values):
+        bitmap: int = 0
+        for value in values:
+            bitmap |= self.postings[field].get(value, 0)
+        return bitmap
+
+    def any_value(self, field: str):
+        return self.any_values[field]
+
+    def page(self, bitmap: int, field: str, descending: bool, offset: int, limit):
+        """One page of results in a presorted field order, without sorting them."""
+        order = self.sort_orders[(field, descending)]
+        ids = order[self.columns.from_bitmap(bitmap)[order]]
+        end = None if limit is None else offset + limit
+        return [self.names[i] for i in ids[offset:end]]
+
+    def facet_counts(self, bitmap: int, fields):
+        """Per-value result counts for each field, e.g. {"level": {3: 12, 4: 2}}."""
+        facets: dict = {}
+        for field in fields:
+            counts: dict = {}
+            for value in sorted(self.postings[field], key=str):
+                count: int = (self.postings[field][value] & bitmap).bit_count()
+                if count and value is not None:
+                    counts[value] = count
+            facets[field] = counts
+        return facets
+
+    def encode(self, names):
+        bitmap: int = 0
+        for name in names:
+            bitmap |= 1 << self.ids[name]
+        return bitmap
+
+    def decode(self, bitmap: int):
+        # IDs follow alphabetical order, so results come out sorted by name
+        names: list[str] = [self.names[i] for i in bitmap_ids(bitmap)]
+        return names if self.in_name_order else sorted(names)
@@ -0,0 +1,407 @@
+# the search indices as flat arrays in one file, opened with mmap so every worker
+# process on a machine reads the same page cache copy instead of its own indices
+# build it pre-deploy, from the repo root: python -m src.search.mapped_handler
+import bisect
+import json
+import logging
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from src.search.column_handler import SpellColumns
+from src.search.index_handler import (
+    NumericRangeIndex,
+    SpellCatalog,
+    TokenIndex,
+    TrigramIndex,
+    bitmap_ids,
+)
+from src.search.snapshot_handler import SPELLS_JSON, source_digest
+
+logger = logging.getLogger(__name__)
+
+MAPPED_PATH: str = "src/data/catalog.columns"
+
+MAGIC: bytes = b"DNDCOLS\x00"
+# bump when the file layout itself changes
+MAPPED_FORMAT: int = 1
+# magic, format, source digest, directory length; the JSON directory follows
+HEADER: struct.Struct = struct.Struct("<8sI32sQ")
+# every array starts on a multiple of this, so numpy can view it in place
+ALIGNMENT: int = 8
+# posting lists up to this long become bitmaps without a numpy mask (most tokens)
+SHORT_POSTINGS: int = 32
+
+
+def encode_key(value):
+    """Posting list keys as sortable strings; 60 and 60.0 share one, as in a dict."""
+    if value is None:
+        return "z"
+    if isinstance(value, bool):
+        return "b" + str(int(value))
+    if isinstance(value, (int, float)):
+        # "\x00i" sorts right after the float form, so lookups find either type
+        return "n" + repr(float(value)) + ("" if isinstance(value, float) else "\x00i")
+    return "s" + value
+
+
+def decode_key(key: str):
+    kind, rest = key[0], key[1:]
+    if kind == "z":
+        return None
+    if kind == "b":
+        return rest == "1"
+    if kind == "n":
+        number, _, integer = rest.partition("\x00")
+        return int(float(number)) if integer else float(number)
+    return rest
+
+
+def ids_bitmap(ids: np.ndarray, size: int):
+    # packed uint32 IDs -> the same int bitmap an in-memory posting list holds
+    if len(ids) <= SHORT_POSTINGS:
+        return sum(1 << spell_id for spell_id in ids.tolist())
+    mask: np.ndarray = np.zeros(size, dtype=bool)
+    mask[ids] = True
+    return SpellColumns.to_bitmap(mask)
+
+
+# strings i are heap[offsets[i]:offsets[i + 1]], UTF-8, decoded on access
+class MappedStrings(Sequence):
+    def __init__(self, heap: np.ndarray, offsets: np.ndarray):
+        # memoryviews: slicing and indexing them is far cheaper than numpy's
+        self.heap: memoryview = memoryview(heap)
+        self.offsets: memoryview = memoryview(offsets)
+        self.size: int = len(offsets) - 1
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.size))]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        return str(self.heap[self.offsets[i] : self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        heap, offsets = self.heap, self.offsets
+        for i in range(self.size):
+            yield str(heap[offsets[i] : offsets[i + 1]], "utf-8")
+
+
+# read-only dict of key -> bitmap; keys are a sorted, fixed-width byte column in
+# the file, decoded once on open so lookups and vocabulary scans stay in Python
+class MappedPostings(Mapping):
+    def __init__(self, keys: np.ndarray, offsets, ids, size: int, typed: bool):
+        self.sorted_keys: list[str] = [key.decode() for key in keys.tolist()]
+        self.offsets: np.ndarray = offsets
+        self.ids: np.ndarray = ids
+        self.size: int = size
+        # field postings hold typed keys (see encode_key), token/gram postings str
+        self.typed: bool = typed
+
+    def find(self, key):
+        """Position of key among the sorted keys, or -1."""
+        keys: list[str] = self.sorted_keys
+        if not self.typed:
+            i: int = bisect.bisect_left(keys, key)
+            return i if i < len(keys) and keys[i] == key else -1
+        # 60 finds a 60.0 key and 60.0 a 60 key, as they would in a dict
+        encoded: str = encode_key(key).partition("\x00")[0]
+        i = bisect.bisect_left(keys, encoded)
+        if i < len(keys) and keys[i] in (encoded, encoded + "\x00i"):
+            return i
+        return -1
+
+    def spell_ids(self, i: int):
+        return self.ids[self.offsets[i] : self.offsets[i + 1]]
+
+    def __getitem__(self, key):
+        i: int = self.find(key)
+        if i < 0:
+            raise KeyError(key)
+        return ids_bitmap(self.spell_ids(i), self.size)
+
+    def __contains__(self, key):
+        return self.find(key) >= 0
+
+    def __iter__(self):
+        if not self.typed:
+            return iter(self.sorted_keys)
+        return (decode_key(key) for key in self.sorted_keys)
+
+    def __len__(self):
+        return len(self.sorted_keys)
+
+
+# positions[token][spell_id] -> bitmap of word positions, as in TokenIndex; one
+# uint32 run of positions per (token, spell) pair of the token postings
+class MappedPositions:
+    def __init__(self, tokens: MappedPostings, offsets, positions):
+        self.tokens: MappedPostings = tokens
+        self.offsets: np.ndarray = offsets
+        self.positions: np.ndarray = positions
+
+    def __getitem__(self, token: str):
+        i: int = self.tokens.find(token)
+        if i < 0:
+            raise KeyError(token)
+        return MappedTokenPositions(self, i)
+
+
+class MappedTokenPositions:
+    def __init__(self, mapped: MappedPositions, i: int):
+        # one token's runs as Python lists (a few C-level copies), so the
+        # per-spell lookups phrase() makes don't go through numpy
+        spell_ids: np.ndarray = mapped.tokens.spell_ids(i)
+        start: int = int(mapped.tokens.offsets[i])
+        self.spell_ids: list[int] = spell_ids.tolist()
+        self.offsets: list[int] = mapped.offsets[
+            start : start + len(spell_ids) + 1
+        ].tolist()
+        self.positions: list[int] = mapped.positions[
+            self.offsets[0] : self.offsets[-1]
+        ].tolist()
+
+    def __getitem__(self, spell_id: int):
+        j: int = bisect.bisect_left(self.spell_ids, spell_id)
+        if j == len(self.spell_ids) or self.spell_ids[j] != spell_id:
+            raise KeyError(spell_id)
+        start: int = self.offsets[j] - self.offsets[0]
+        end: int = self.offsets[j + 1] - self.offsets[0]
+        if end - start == 1:
+            return 1 << self.positions[start]
+        return sum(1 << position for position in self.positions[start:end])
+
+    def get(self, spell_id: int, default=None):
+        try:
+            return self[spell_id]
+        except KeyError:
+            return default
+
+
+# name -> ID without a dict: IDs are in name order, so it's a binary search
+class MappedIds(Mapping):
+    def __init__(self, names: list[str]):
+        self.names: list[str] = names
+
+    def __getitem__(self, name: str):
+        i: int = bisect.bisect_left(self.names, name)
+        if i < len(self.names) and self.names[i] == name:
+            return i
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class MappedWriter:
+    def __init__(self):
+        # name -> array, in file order
+        self.arrays: dict[str, np.ndarray] = {}
+        # anything else the reader needs, e.g. which fields get range indices
+        self.meta: dict = {}
+
+    def array(self, name: str, values, dtype):
+        self.arrays[name] = np.ascontiguousarray(values, dtype=dtype)
+
+    def strings(self, name: str, values):
+        encoded: list[bytes] = [value.encode() for value in values]
+        self.array(f"{name}/heap", np.frombuffer(b"".join(encoded), np.uint8), np.uint8)
+        self.array(
+            f"{name}/offsets",
+            np.cumsum([0] + [len(value) for value in encoded]),
+            np.uint64,
+        )
+
+    def postings(self, name: str, postings: dict, typed: bool):
+        keys: list = sorted(postings, key=encode_key if typed else None)
+        encoded: list[bytes] = [(encode_key(k) if typed else k).encode() for k in keys]
+        # padded to the longest key; numpy compares them as plain bytes
+        self.array(f"{name}/keys", encoded, f"S{max(map(len, encoded), default=1)}")
+        ids: list[list[int]] = [bitmap_ids(postings[k]) for k in keys]
+        self.array(f"{name}/offsets", np.cumsum([0] + [len(i) for i in ids]), np.uint64)
+        self.array(f"{name}/ids", [i for run in ids for i in run], np.uint32)
+        return keys, ids
+
+    def write(self, path: str, json_path: str):
+        directory: dict = {"meta": self.meta, "arrays": {}}
+        offset: int = 0
+        for name, values in self.arrays.items():
+            directory["arrays"][name] = [values.dtype.str, offset, len(values)]
+            offset += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded: bytes = json.dumps(directory).encode()
+        start: int = -(-(HEADER.size + len(encoded)) // ALIGNMENT) * ALIGNMENT
+        header: bytes = HEADER.pack(
+            MAGIC, MAPPED_FORMAT, source_digest(json_path), len(encoded)
+        )
+        with open(file=path, mode="wb") as mapped:
+            mapped.write((header + encoded).ljust(start, b"\x00"))
+            for values in self.arrays.values():
+                data: bytes = values.tobytes()
+                mapped.write(
+                    data.ljust(-(-len(data) // ALIGNMENT) * ALIGNMENT, b"\x00")
+                )
+
+
+def write_mapped_catalog(path: str, json_path: str, indices: SpellCatalog):
+    if not indices.in_name_order or None in indices.names:
+        # mapped IDs have to be name order with no gaps, see MappedIds
+        raise ValueError("catalog was changed in place, rebuild it before writing")
+    writer = MappedWriter()
+    writer.meta["fields"] = list(indices.postings)
+    writer.meta["numeric_ranges"] = list(indices.numeric_ranges)
+    writer.strings("names", indices.names)
+    for field, postings in indices.postings.items():
+        writer.postings(f"postings/{field}", postings, typed=True)
+        writer.array(f"any/{field}", bitmap_ids(indices.any_values[field]), np.uint32)
+        writer.array(
+            f"populated/{field}", bitmap_ids(indices.populated[field]), np.uint32
+        )
+    for field, column in indices.columns.columns.items():
+        writer.array(f"columns/{field}", column, column.dtype)
+    for (field, descending), order in indices.sort_orders.items():
+        writer.array(f"sort/{field}/{int(descending)}", order, np.int64)
+
+    descriptions: TokenIndex = indices.descriptions
+    writer.strings("descriptions/texts", descriptions.texts)
+    tokens, ids = writer.postings(
+        "descriptions/postings", descriptions.postings, typed=False
+    )
+    # positions runs in the same (token, spell) order as the postings ids
+    runs: list[list[int]] = [
+        bitmap_ids(descriptions.positions[token][spell_id])
+        for token, spell_ids in zip(tokens, ids)
+        for spell_id in spell_ids
+    ]
+    writer.array(
+        "descriptions/positions/offsets",
+        np.cumsum([0] + [len(run) for run in runs]),
+        np.uint64,
+    )
+    writer.array(
+        "descriptions/positions/ids", [p for run in runs for p in run], np.uint32
+    )
+
+    writer.strings("name_grams/texts", indices.name_grams.texts)
+    writer.postings("name_grams/trigrams", indices.name_grams.trigrams, typed=False)
+    writer.postings("name_grams/short", indices.name_grams.short_grams, typed=False)
+    writer.write(path, json_path)
+
+
+def open_mapped_catalog(path: str, json_path: str):
+    """A read-only SpellCatalog over a mapped file, or None if it's missing or stale.
+
+    Search results are the same as the in-memory catalog's; add(), remove() and
+    update() aren't supported, rebuild the file instead.
+    """
+    try:
+        with open(file=path, mode="rb") as source:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, digest, length = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != MAPPED_FORMAT:
+            logger.info("%s is not a format %d mapped catalog", path, MAPPED_FORMAT)
+            return None
+        if digest != source_digest(json_path):
+            logger.info("%s is stale, %s or the code changed", path, json_path)
+            return None
+        directory: dict = json.loads(mapped[HEADER.size : HEADER.size + length])
+        start: int = -(-(HEADER.size + length) // ALIGNMENT) * ALIGNMENT
+
+        def array(name: str):
+            dtype, offset, count = directory["arrays"][name]
+            return np.frombuffer(mapped, np.dtype(dtype), count, start + offset)
+
+        # the arrays viewing the mapping keep it open as long as the catalog lives
+        return mapped_catalog(directory, array)
+    except FileNotFoundError:
+        logger.info("no mapped catalog at %s", path)
+        return None
+    except Exception:
+        # unreadable or truncated: search the in-memory indices instead
+        logger.warning("can't open %s, using in-memory indices", path, exc_info=True)
+        return None
+
+
+def mapped_catalog(directory: dict, array):
+    def strings(name: str):
+        return MappedStrings(array(f"{name}/heap"), array(f"{name}/offsets"))
+
+    # every result is a name, so they're decoded once rather than per result
+    names: list[str] = list(strings("names"))
+    size: int = len(names)
+
+    def postings(name: str, typed: bool):
+        return MappedPostings(
+            array(f"{name}/keys"),
+            array(f"{name}/offsets"),
+            array(f"{name}/ids"),
+            size,
+            typed,
+        )
+
+    fields: list[str] = directory["meta"]["fields"]
+    # an empty catalog, then every structure swapped for its mapped counterpart
+    catalog = SpellCatalog(names=[], fields=[])
+    catalog.names = names
+    catalog.ids = MappedIds(names)
+    catalog.universe = (1 << size) - 1
+    catalog.postings = {field: postings(f"postings/{field}", True) for field in fields}
+    # one bitmap per field, small enough to keep as ints
+    catalog.any_values = {
+        field: ids_bitmap(array(f"any/{field}"), size) for field in fields
+    }
+    catalog.populated = {
+        field: ids_bitmap(array(f"populated/{field}"), size) for field in fields
+    }
+    catalog.columns = SpellColumns(0)
+    catalog.columns.size = size
+    catalog.columns.columns = {
+        name.split("/")[1]: array(name)
+        for name in directory["arrays"]
+        if name.startswith("columns/")
+    }
+    catalog.sort_orders = {
+        (name.split("/")[1], name.split("/")[2] == "1"): array(name)
+        for name in directory["arrays"]
+        if name.startswith("sort/")
+    }
+    # a few dozen keys per field; their prefix/suffix unions are built on open
+    catalog.numeric_ranges = {
+        field: NumericRangeIndex.from_postings(catalog.postings[field])
+        for field in directory["meta"]["numeric_ranges"]
+    }
+
+    tokens: MappedPostings = postings("descriptions/postings", False)
+    catalog.descriptions = TokenIndex(
+        texts=strings("descriptions/texts"),
+        postings=tokens,
+        positions=MappedPositions(
+            tokens,
+            array("descriptions/positions/offsets"),
+            array("descriptions/positions/ids"),
+        ),
+    )
+    catalog.name_grams = TrigramIndex(
+        texts=strings("name_grams/texts"),
+        trigrams=postings("name_grams/trigrams", False),
+        short_grams=postings("name_grams/short", False),
+    )
+    return catalog
+
+
+if __name__ == "__main__":
+    from src.orchestration import create_indices, spell_objects_from_JSON
+
+    with open(file=SPELLS_JSON, mode="r") as spell_JSON:
+        spells: dict = spell_objects_from_JSON(json.load(spell_JSON))
+    write_mapped_catalog(MAPPED_PATH, SPELLS_JSON, create_indices(spells))
+    print(f"wrote {MAPPED_PATH} ({len(spells)} spells)")
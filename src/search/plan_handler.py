@@ -0,0 +1,203 @@
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from src.search.cache_handler import canonical_key
+from src.search.command_handler import SearchCommand, SearchExpression
+from src.search.index_handler import SpellCatalog
+from src.search.regex_handler import REGEX_BUDGET
+from src.search.search_handler import SCAN_FIELDS, STRATEGY_MAPPINGS, SearchExecution
+
+
+class QueryPlanning:
+    def __init__(
+        self,
+        expression: SearchExpression,
+        spells: dict,
+        indices,
+        evaluated: dict | None = None,
+    ):
+        self.expression: SearchExpression = expression
+        self.spells: dict = spells
+        self.indices: SpellCatalog = indices
+        # canonical key -> (candidates evaluated against, result); per query, or
+        # shared by a whole batch of queries
+        self.evaluated: dict = {} if evaluated is None else evaluated
+        self.deadline: float = time.perf_counter() + REGEX_BUDGET
+
+    def run(self):
+        return self.evaluate(self.expression, self.indices.universe)
+
+    def evaluate(self, node, candidates: int):
+        key: tuple = canonical_key(node)
+        if key in self.evaluated:
+            seen_candidates, result = self.evaluated[key]
+            # exact within the spells it looked at, so reusable for any subset
+            if not candidates & ~seen_candidates:
+                return result & candidates
+
+        if isinstance(node, SearchCommand):
+            result = self.run_command(node, candidates)
+        elif node.operator == "OR":
+            result = 0
+            for operand in node.operands:
+                result |= self.evaluate(operand, candidates)
+        else:
+            result = self.intersect(node.operands, candidates)
+
+        if isinstance(node, SearchExpression) and node.modifier == "NOT":
+            result = candidates & ~result
+        result &= candidates
+        self.evaluated[key] = (candidates, result)
+        return result
+
+    def run_command(self, command: SearchCommand, candidates: int):
+        execution = SearchExecution(command, self.spells, self.indices, self.deadline)
+        pre_result: int = execution.execute(candidates)
+        return execution.applying_NOT_ANY_modifier(pre_result)
+
+    def column_masks(self, executions: list[SearchExecution], candidates: int):
+        return [ex.column_mask() for ex in executions if ex.columnar()]
+
+    def intersect(self, operands: tuple, candidates: int):
+        commands: list = [op for op in operands if isinstance(op, SearchCommand)]
+        groups: list = [op for op in operands if isinstance(op, SearchExpression)]
+        # clauses already evaluated (e.g., earlier in a batch) are reused first
+        reused: list = [c for c in commands if canonical_key(c) in self.evaluated]
+        executions: list[SearchExecution] = [
+            SearchExecution(command, self.spells, self.indices, self.deadline)
+            for command in commands
+            if canonical_key(command) not in self.evaluated
+        ]
+        # all scalar clauses at once: one mask product, one bitmap conversion
+        masks: list = self.column_masks(executions, candidates)
+        if masks:
+            candidates &= self.indices.columns.to_bitmap(np.logical_and.reduce(masks))
+        ordered: list = reused + self.plan(executions) + groups
+        for position, operand in enumerate(ordered):
+            if not candidates:
+                self.skip(ordered[position:])
+                break
+            candidates &= self.evaluate(operand, candidates)
+        return candidates
+
+    def skip(self, operands: list):
+        # nothing left to narrow down; the remaining clauses never run
+        pass
+
+    def plan(self, executions: list[SearchExecution]):
+        # posting list reads first, smallest first; scans run last, on fewer spells
+        return [
+            ex.command
+            for ex in sorted(
+                (ex for ex in executions if not ex.columnar()),
+                key=lambda ex: (ex.command.field in SCAN_FIELDS, ex.estimate()),
+            )
+        ]
+
+
+# explain:true; runs the same plan, recording what each clause did and took
+class QueryExplaining(QueryPlanning):
+    def __init__(self, expression, spells, indices, evaluated=None):
+        super().__init__(expression, spells, indices, evaluated)
+        self.clauses: list[dict] = []
+        self.timings: dict[str, float] = defaultdict(float)
+
+    def run(self):
+        started: float = time.perf_counter()
+        result: int = super().run()
+        total: float = (time.perf_counter() - started) * 1000
+        # whatever wasn't clause work: planning, estimates, ANDs and ORs
+        self.timings["intersect"] = (
+            total - self.timings["execute"] - self.timings["modifier"]
+        )
+        return result
+
+    def run_command(self, command: SearchCommand, candidates: int):
+        execution = SearchExecution(command, self.spells, self.indices, self.deadline)
+        started: float = time.perf_counter()
+        pre_result: int = execution.execute(candidates)
+        executed: float = time.perf_counter()
+        result: int = execution.applying_NOT_ANY_modifier(pre_result)
+        self.record(
+            execution,
+            candidates,
+            pre_result,
+            result & candidates,
+            executed - started,
+            time.perf_counter() - executed,
+            columnar=False,
+        )
+        return result
+
+    def column_masks(self, executions: list[SearchExecution], candidates: int):
+        masks: list = []
+        for ex in executions:
+            if not ex.columnar():
+                continue
+            started: float = time.perf_counter()
+            mask = ex.column_mask()
+            elapsed: float = time.perf_counter() - started
+            matched: int = self.indices.columns.to_bitmap(mask)
+            # the NOT modifier is applied inside the mask, timed with it
+            self.record(
+                ex, candidates, matched, matched & candidates, elapsed, None, True
+            )
+            masks.append(mask)
+        return masks
+
+    def skip(self, operands: list):
+        for operand in operands:
+            commands = (
+                operand.commands()
+                if isinstance(operand, SearchExpression)
+                else [operand]
+            )
+            self.clauses.extend(
+                {
+                    "clause": describe(command),
+                    "strategy": "skipped (no candidates)",
+                    "postings": [],
+                    "candidates": 0,
+                    "matched": None,
+                    "results": 0,
+                    "execute_ms": None,
+                    "modifier_ms": None,
+                }
+                for command in commands
+            )
+
+    def record(
+        self, execution, candidates, matched, result, execute, modifier, columnar
+    ):
+        command: SearchCommand = execution.command
+        self.timings["execute"] += execute * 1000
+        self.timings["modifier"] += (modifier or 0) * 1000
+        strategy: str = STRATEGY_MAPPINGS.get(command.operator, "")
+        self.clauses.append(
+            {
+                "clause": describe(command),
+                "strategy": strategy + (" (columnar)" if columnar else ""),
+                "postings": execution.touched(columnar),
+                "candidates": candidates.bit_count(),
+                "matched": matched.bit_count(),
+                "results": result.bit_count(),
+                "execute_ms": round(execute * 1000, 3),
+                "modifier_ms": None if modifier is None else round(modifier * 1000, 3),
+            }
+        )
+
+
+def describe(command: SearchCommand):
+    # e.g. -dt:(cold fire), *st, level>=3
+    prefix: str = {"NOT": "-", "ANY": "*"}.get(command.modifier or "", "")
+    if not command.values:
+        return prefix + command.field
+    values: list = sorted(
+        f"/{value.pattern}/" if isinstance(value, re.Pattern) else str(value)
+        for value in command.values
+    )
+    value: str = values[0] if len(values) == 1 else f"({' '.join(values)})"
+    return f"{prefix}{command.field}{command.operator}{value}"
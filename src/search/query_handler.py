@@ -1,12 +1,18 @@
 import re
 from dataclasses import dataclass
 
-PARSING_PATTERN = r"""(?x)
-        (-)?(\w+)([<>=:]+)\(([^)]+)\)|# -dt:(fire cold)
-        (-)?(\w+)([<>=:]+)([^\s()]+)|# -dt:fire
-        ([-*])(\w+)|# NOT and ANY applicable fields
-        (-)?(\w+)# name search
-        """
+# character runs the lexer reads in one step; no alternation, so no backtracking
+WORD_RUN: re.Pattern = re.compile(r"\w+")
+OPERATOR_RUN: re.Pattern = re.compile(r"[<>=:-]+")
+VALUE_RUN: re.Pattern = re.compile(r"[^\s()]+")
+LIST_VALUE_RUN: re.Pattern = re.compile(r"[^\s)]+")
+SPACE_RUN: re.Pattern = re.compile(r"\s+")
+
+
+class QueryParsingError(ValueError):
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} at position {position}")
+        self.position: int = position
 
 
 @dataclass
@@ -15,46 +21,254 @@ class ParsedQuery:
     operator: str
     values: list | None
     modifier: str | None = None
+    # character offsets of the clause in the raw query
+    start: int | None = None
+    end: int | None = None
+
+
+# parenthesized terms, or terms joined by "OR"; modifier "NOT" for -( ... )
+@dataclass
+class ParsedGroup:
+    operator: str  # "AND" or "OR"
+    items: list
+    modifier: str = ""
+    start: int | None = None
+    end: int | None = None
 
 
+# single pass over the query, one clause at a time:
+#   -dt:(fire cold) | -dt:fire | -st or *st | fire (name search)
+#   desc:"saving throw" | desc:("saving throw" cold) | "fire bolt" (phrases,
+#   quotes kept: desc:"fire" is the whole word, desc:fire also finds fireball)
+#   desc:/\d+d\d+ fire/ (regex, slashes kept so validation can tell it apart)
+# plus grouping: terms are ANDed, "OR" binds looser, e.g. (l:1 dt:fire) OR l:2;
+# uppercase only, lowercase "or" is part of names like "Create or Destroy Water"
 class QueryParsing:
     def __init__(self, query: str):
         self.raw_query = query
+        self.position: int = 0
 
     def parse_query(self):
-        parsed_inputs: list = []
-        pattern: str = PARSING_PATTERN
-        for match in re.finditer(pattern, string=self.raw_query):
-            if match.group(2):
-                m_: str = "NOT" if match.group(1) == "-" else ""
-                f_: str = match.group(2)
-                o_: str = match.group(3)
-                v_: list = match.group(4).split()
-                parsed_inputs.append(
-                    ParsedQuery(field=f_.lower(), operator=o_, values=v_, modifier=m_)
-                )
-            elif match.group(6):
-                m_: str = "NOT" if match.group(5) == "-" else ""
-                f_: str = match.group(6)
-                o_: str = match.group(7)
-                v_: list = match.group(8).split()
-                parsed_inputs.append(
-                    ParsedQuery(field=f_.lower(), operator=o_, values=v_, modifier=m_)
-                )
-            elif match.group(10):
-                m_ = "ANY" if match.group(9) == "*" else "NOT"
-                f_ = match.group(10)
-                o_: str = ":"
-                v_: None = None
-                parsed_inputs.append(
-                    ParsedQuery(field=f_, operator=o_, values=None, modifier=m_)
-                )
-            else:
-                m_ = "NOT" if match.group(11) == "-" else ""
-                f_ = "spell_name"
-                o_ = ":"
-                v_ = [match.group(12)]
-                parsed_inputs.append(
-                    ParsedQuery(field=f_, operator=o_, values=v_, modifier=m_)
-                )
-        return parsed_inputs
+        """Top-level terms, implicitly ANDed; an "OR" query is a single OR group."""
+        self.position = 0
+        return self._expression(group_start=None)
+
+    def _expression(self, group_start: int | None):
+        query: str = self.raw_query
+        start: int = self.position
+        branches: list[list] = [[]]
+        while True:
+            space = SPACE_RUN.match(query, self.position)
+            if space:
+                self.position = space.end()
+            if self.position == len(query):
+                if group_start is not None:
+                    raise QueryParsingError("Unclosed '('", group_start)
+                break
+            if query[self.position] == ")":
+                if group_start is None:
+                    raise QueryParsingError("Unexpected character ')'", self.position)
+                self.position += 1
+                break
+            if self._at_or():
+                if not branches[-1]:
+                    raise QueryParsingError(
+                        "Missing search term before 'OR'", self.position
+                    )
+                self.position += 2
+                branches.append([])
+                continue
+            branches[-1].append(self._clause())
+
+        if len(branches) > 1 and not branches[-1]:
+            raise QueryParsingError("Missing search term after 'OR'", self.position)
+        if len(branches) == 1:
+            return branches[0]
+        return [
+            ParsedGroup(
+                operator="OR",
+                items=[
+                    branch[0]
+                    if len(branch) == 1
+                    else ParsedGroup(
+                        operator="AND",
+                        items=branch,
+                        start=branch[0].start,
+                        end=branch[-1].end,
+                    )
+                    for branch in branches
+                ],
+                start=start,
+                end=self.position,
+            )
+        ]
+
+    def _at_or(self):
+        word = WORD_RUN.match(self.raw_query, self.position)
+        return (
+            word is not None
+            and word.group() == "OR"
+            and not OPERATOR_RUN.match(self.raw_query, word.end())
+            and not self.raw_query.startswith("'", word.end())
+        )
+
+    def _group(self, start: int, modifier: str):
+        self.position += 1
+        items: list = self._expression(group_start=self.position - 1)
+        if not items:
+            raise QueryParsingError("Empty group", start)
+        return ParsedGroup(
+            operator="AND",
+            items=items,
+            modifier=modifier,
+            start=start,
+            end=self.position,
+        )
+
+    def _clause(self):
+        query: str = self.raw_query
+        start: int = self.position
+        prefix: str = ""
+        if query[start] in "-*":
+            prefix = query[start]
+            self.position += 1
+        if query.startswith("(", self.position):
+            if prefix == "*":
+                raise QueryParsingError("'*' can't be applied to a group", start)
+            return self._group(start, modifier="NOT" if prefix == "-" else "")
+        if query.startswith('"', self.position):
+            if prefix == "*":
+                raise QueryParsingError("'*' can't be applied to a phrase", start)
+            v_: list = [self._phrase()]
+            return ParsedQuery(
+                field="spell_name",
+                operator=":",
+                values=v_,
+                modifier="NOT" if prefix == "-" else "",
+                start=start,
+                end=self.position,
+            )
+        f_: str = self._word()
+
+        operator = OPERATOR_RUN.match(query, self.position)
+        if operator:
+            if prefix == "*":
+                raise QueryParsingError("'*' can't be combined with an operator", start)
+            o_: str = operator.group()
+            self.position = operator.end()
+            v_: list = self._values()
+            return ParsedQuery(
+                field=f_.lower(),
+                operator=o_,
+                values=v_,
+                modifier="NOT" if prefix == "-" else "",
+                start=start,
+                end=self.position,
+            )
+        # NOT and ANY applicable fields
+        if prefix:
+            return ParsedQuery(
+                field=f_,
+                operator=":",
+                values=None,
+                modifier="ANY" if prefix == "*" else "NOT",
+                start=start,
+                end=self.position,
+            )
+        # name search; apostrophes are part of names, e.g. hunter's
+        while query.startswith("'", self.position) and WORD_RUN.match(
+            query, self.position + 1
+        ):
+            self.position += 1
+            f_ += "'" + self._word()
+        return ParsedQuery(
+            field="spell_name",
+            operator=":",
+            values=[f_],
+            modifier="",
+            start=start,
+            end=self.position,
+        )
+
+    def _word(self):
+        query: str = self.raw_query
+        start: int = self.position
+        word = WORD_RUN.match(query, start)
+        if not word:
+            if start == len(query) or query[start].isspace():
+                raise QueryParsingError("Expected a search term", start)
+            raise QueryParsingError(f"Unexpected character '{query[start]}'", start)
+        self.position = word.end()
+        return word.group()
+
+    def _values(self):
+        query: str = self.raw_query
+        start: int = self.position
+        if start == len(query) or query[start].isspace():
+            raise QueryParsingError("Missing value after operator", start)
+        if query[start] == ")":
+            raise QueryParsingError("Unexpected character ')'", start)
+        if query[start] == '"':
+            return [self._phrase()]
+        if query[start] == "/":
+            return [self._regex()]
+        if query[start] != "(":
+            value = VALUE_RUN.match(query, start)
+            self.position = value.end()
+            return [value.group()]
+        # -dt:(fire cold), desc:("saving throw" cold), desc:(/fi re/ cold)
+        self.position += 1
+        values: list = []
+        while True:
+            space = SPACE_RUN.match(query, self.position)
+            if space:
+                self.position = space.end()
+            if self.position == len(query):
+                raise QueryParsingError("Unclosed '('", start)
+            if query[self.position] == ")":
+                break
+            if query[self.position] == '"':
+                values.append(self._phrase())
+                continue
+            if query[self.position] == "/":
+                values.append(self._regex())
+                continue
+            value = LIST_VALUE_RUN.match(query, self.position)
+            self.position = value.end()
+            values.append(value.group())
+        if not values:
+            raise QueryParsingError("Empty value list", start)
+        self.position += 1
+        return values
+
+    def _regex(self):
+        query: str = self.raw_query
+        start: int = self.position
+        end: int = start + 1
+        while end < len(query) and query[end] != "/":
+            # \/ is a slash inside the regex
+            end += 2 if query[end] == "\\" else 1
+        if end >= len(query):
+            raise QueryParsingError("Unclosed '/'", start)
+        self.position = end + 1
+        return query[start : end + 1]
+
+    def _phrase(self):
+        # "saving  throw" -> "saving throw"; whole words in sequence
+        start: int = self.position
+        end: int = self.raw_query.find('"', start + 1)
+        if end == -1:
+            raise QueryParsingError("Unclosed '\"'", start)
+        phrase: str = " ".join(self.raw_query[start + 1 : end].split())
+        if not phrase:
+            raise QueryParsingError("Empty phrase", start)
+        self.position = end + 1
+        return f'"{phrase}"'
+
+
+def is_phrase(value: str):
+    return len(value) > 2 and value.startswith('"') and value.endswith('"')
+
+
+def unquoted(value: str):
+    return value[1:-1] if is_phrase(value) else value
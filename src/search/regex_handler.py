@@ -0,0 +1,114 @@
+import multiprocessing
+import re
+import threading
+from re import _parser
+
+# wall time (seconds) all regex clauses of a query share before it's aborted
+REGEX_BUDGET: float = 0.1
+# processes regexes run in; re can't be stopped mid-search from another thread,
+# but a worker past its deadline can be killed
+REGEX_WORKERS: int = 2
+# searchable with desc:/.../ and name:/.../
+REGEX_FIELDS: set = {"spell_name", "description"}
+
+REPEATS: tuple = (_parser.MAX_REPEAT, _parser.MIN_REPEAT, _parser.POSSESSIVE_REPEAT)
+
+
+class RegexTimeout(ValueError):
+    pass
+
+
+# started on first use, and again after a timeout had to terminate it
+REGEX_POOL: dict = {}
+REGEX_POOL_LOCK: threading.Lock = threading.Lock()
+
+
+def is_regex(value: str):
+    return len(value) > 2 and value.startswith("/") and value.endswith("/")
+
+
+def compile_regex(value: str):
+    """/pattern/ -> case insensitive pattern, refusing ones that can backtrack forever."""
+    try:
+        parsed = _parser.parse(value[1:-1], re.IGNORECASE)
+        pattern: re.Pattern = re.compile(value[1:-1], re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"'{value}' is not a valid regex: {e}")
+    if _nested_repeat(parsed, inside_repeat=False):
+        raise ValueError(f"'{value}' nests repeats (e.g., (a+)+), try a simpler regex")
+    return pattern
+
+
+def search_texts(pattern: re.Pattern, texts: list[str], timeout: float | None):
+    """Indices of the texts the pattern matches; RegexTimeout past the timeout."""
+    if timeout is None:
+        return _search_texts(pattern.pattern, pattern.flags, texts)
+    with REGEX_POOL_LOCK:
+        pool = REGEX_POOL.get("pool")
+        if pool is None:
+            # forkserver: the app runs threads, which fork doesn't play well with
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            pool = context.Pool(REGEX_WORKERS)
+            # wait for the workers to be up; not part of any query's budget
+            pool.apply(_search_texts, ("", 0, []))
+            REGEX_POOL["pool"] = pool
+    task = pool.apply_async(_search_texts, (pattern.pattern, pattern.flags, texts))
+    try:
+        return task.get(timeout=max(timeout, 0))
+    except multiprocessing.TimeoutError:
+        with REGEX_POOL_LOCK:
+            if REGEX_POOL.get("pool") is pool:
+                del REGEX_POOL["pool"]
+        # kills the worker stuck in the match (and any other query's task on it,
+        # which then times out in turn)
+        pool.terminate()
+        raise RegexTimeout(
+            f"/{pattern.pattern}/ took too long, try a more specific regex"
+        )
+
+
+def _search_texts(source: str, flags: int, texts: list[str]):
+    # runs in a worker; patterns are sent as source, compiled (and cached) here
+    pattern: re.Pattern = re.compile(source, flags)
+    return [i for i, text in enumerate(texts) if pattern.search(text)]
+
+
+def required_literals(pattern: re.Pattern):
+    """Lowercased substrings every match contains, e.g. /\\d+d\\d+ fire/ -> d, fire."""
+    literals: list[str] = []
+    _collect(_parser.parse(pattern.pattern, pattern.flags), literals)
+    return [literal.lower() for literal in literals if literal.strip()]
+
+
+def _collect(parsed, literals: list[str]):
+    # only literals outside alternations and optional parts are required
+    run: list[str] = []
+    for op, av in parsed:
+        if op is _parser.LITERAL:
+            run.append(chr(av))
+            continue
+        literals.append("".join(run))
+        run = []
+        if op is _parser.SUBPATTERN:
+            _collect(av[-1], literals)
+        elif op in REPEATS and av[0] >= 1:
+            _collect(av[2], literals)
+    literals.append("".join(run))
+
+
+def _nested_repeat(parsed, inside_repeat: bool):
+    for op, av in parsed:
+        if op in REPEATS:
+            unbounded: bool = av[1] == _parser.MAXREPEAT
+            if unbounded and inside_repeat:
+                return True
+            if _nested_repeat(av[2], inside_repeat or unbounded):
+                return True
+        elif op is _parser.SUBPATTERN:
+            if _nested_repeat(av[-1], inside_repeat):
+                return True
+        elif op is _parser.BRANCH:
+            if any(_nested_repeat(branch, inside_repeat) for branch in av[1]):
+                return True
+    return False
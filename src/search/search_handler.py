@@ -1,5 +1,6 @@
 import src.specs.units as units
 from src.search.command_handler import SearchCommand
+from src.search.index_handler import SpellCatalog
 
 OP_BY_STRAT: dict = {
     "direct_lookup": {
@@ -13,54 +14,168 @@ OP_BY_STRAT: dict = {
         units.NumericOp.LT_E,
         units.NumericOp.LT,
     },
+    "exclusion_lookup": {
+        units.NumericOp.N_EQ,
+        units.TextOp.N_EQ,
+    },
 }
 
 STRATEGY_MAPPINGS: dict = {
     op: strategy for strategy, ops in OP_BY_STRAT.items() for op in ops
 }
 
+# unit words numeric searches accept (e.g., rg>=touch, dur<hour) -> their ratio;
+# length units first, so a word in both tables keeps its length ratio
+UNIT_RATIOS: dict = {}
+for table, categories in (
+    (units.LENGTH_UNIT, ["self", "touch", "foot", "mile"]),
+    (
+        units.TIME_UNIT,
+        [
+            "instantaneous",
+            "second",
+            "minute",
+            "hour",
+            "day",
+            "year",
+            "dnd_economy",
+            "until_dispelled",
+        ],
+    ),
+):
+    for category in categories:
+        for alias in table[category]["aliases"]:
+            UNIT_RATIOS.setdefault(alias, table[category]["ratio"])
+
+# fields scanned (and verified) spell by spell rather than read from posting lists
+SCAN_FIELDS: set = {"spell_name", "description"}
+
 
 class SearchExecution:
-    def __init__(self, command, spells, indices):
+    def __init__(self, command, spells, indices, deadline: float | None = None):
         self.command: SearchCommand = command
         self.spells: dict = spells
-        self.indices: dict = indices
-
-    def execute(self):
+        self.indices: SpellCatalog = indices
+        # perf_counter() time regex clauses must finish by, shared per query
+        self.deadline: float | None = deadline
+        # spells still in the running; scans and NOT only look at these
+        self.candidates: int = indices.universe
+
+    def execute(self, candidates: int | None = None):
+        if candidates is not None:
+            self.candidates = candidates
         strat_name = STRATEGY_MAPPINGS.get(self.command.operator, "")
         strategy = getattr(self, strat_name)
         return strategy()
 
+    def estimate(self):
+        """Expected result size of the clause, from index statistics only."""
+        if self.command.modifier == "ANY":
+            return self.indices.any_value(self.command.field).bit_count()
+        if self.command.modifier == "NOT" and len(self.command.values) == 0:
+            return (
+                len(self.indices.names)
+                - self.indices.any_value(self.command.field).bit_count()
+            )
+
+        if self.command.field in SCAN_FIELDS:
+            text_index = (
+                self.indices.name_grams
+                if self.command.field == "spell_name"
+                else self.indices.descriptions
+            )
+            matches = text_index.estimate(self.command.values)
+            if STRATEGY_MAPPINGS[self.command.operator] == "exclusion_lookup":
+                matches = len(self.indices.names) - matches
+        else:
+            matches = self._posting_sizes()
+
+        if self.command.modifier == "NOT":
+            return len(self.indices.names) - matches
+        return matches
+
+    def _posting_sizes(self):
+        # summed posting list sizes, overlaps counted twice; nothing is ORed
+        field: str = self.command.field
+        strategy: str = STRATEGY_MAPPINGS[self.command.operator]
+        if strategy == "range_lookup":
+            # one prefix/suffix bitmap, already merged at build time
+            return self.range_lookup().bit_count()
+        postings = self.indices.postings[field]
+        matches: int = sum(
+            postings.get(
+                self._extract_ratio(v) if isinstance(v, str) else v, 0
+            ).bit_count()
+            for v in self.command.values
+        )
+        if strategy == "exclusion_lookup":
+            return max(self.indices.populated[field].bit_count() - matches, 0)
+        return min(matches, len(self.indices.names))
+
+    def columnar(self):
+        # scalar clauses with values run as vectorized comparisons instead
+        return (
+            self.command.field in self.indices.columns
+            and self.command.modifier != "ANY"
+            and len(self.command.values) > 0
+        )
+
+    def touched(self, columnar: bool):
+        """Index structures the clause read, for explain:true; columnar=False
+        when it ran through execute() (e.g., inside an "OR")."""
+        field: str = self.command.field
+        if self.command.modifier == "ANY" or not self.command.values:
+            return [f"any_values[{field}]"]
+        if columnar:
+            return [f"columns[{field}]"]
+        if field in SCAN_FIELDS:
+            return ["name_grams" if field == "spell_name" else "descriptions"]
+        strategy: str = STRATEGY_MAPPINGS[self.command.operator]
+        if strategy == "range_lookup":
+            return [f"numeric_ranges[{field}]"]
+        touched: list = [f"postings[{field}][{value}]" for value in self.command.values]
+        if strategy == "exclusion_lookup":
+            touched.append(f"populated[{field}]")
+        return touched
+
+    def column_mask(self):
+        columns = self.indices.columns
+        values: list = [
+            self._extract_ratio(v) if isinstance(v, str) else v
+            for v in self.command.values
+        ]
+        values = [v for v in values if not isinstance(v, str)]
+        match STRATEGY_MAPPINGS[self.command.operator]:
+            case "direct_lookup":
+                mask = columns.equal(self.command.field, values)
+            case "exclusion_lookup":
+                mask = columns.not_equal(self.command.field, values)
+            case "range_lookup":
+                mask = (
+                    columns.compare(
+                        self.command.field, self.command.operator, values[0]
+                    )
+                    if values
+                    else columns.nothing()
+                )
+        if self.command.modifier == "NOT":
+            return ~mask
+        return mask
+
     def direct_lookup(self):
         if self.command.field == "spell_name":
-            return {
-                spell
-                for spell in self.indices["spell_name"]
-                if any(v in spell.lower() for v in self.command.values)
-            }
+            return self.indices.name_grams.search(
+                self.command.values, self.candidates, self.deadline
+            )
         if self.command.field in ["description", "desc"]:
-            return {
-                spell
-                for spell in self.spells.keys()
-                if any(
-                    v
-                    in " ".join(
-                        " ".join(self.spells[spell].description).split()
-                    ).lower()
-                    for v in self.command.values
-                )
-            }
+            return self.indices.descriptions.search(
+                self.command.values, self.candidates, self.deadline
+            )
         matches = {
             self._extract_ratio(v) if isinstance(v, str) else v
             for v in self.command.values
         }
-        return set().union(
-            *(
-                self.indices[self.command.field][v]
-                for v in matches
-                if v in self.indices[self.command.field]
-            ),
-        )
+        return self.indices.lookup(self.command.field, matches)
 
     def range_lookup(self):
         # adapt for text comparison; e.g., if isinstance str normalize
@@ -68,66 +183,38 @@ class SearchExecution:
 
         if isinstance(target, str):
             target = self._extract_ratio(target)
-
-        op: dict = {
-            units.NumericOp.GT_E: lambda x: x >= target,
-            units.NumericOp.GT: lambda x: x > target,
-            units.NumericOp.LT_E: lambda x: x <= target,
-            units.NumericOp.LT: lambda x: x < target,
-        }
-        match_keys: list = []
-
-        for k in self.indices[self.command.field].keys():
-            try:
-                numeric_k = float(k)
-                if op[self.command.operator](numeric_k):
-                    match_keys.append(k)
-            except (ValueError, TypeError):
-                pass
-
-        return set().union(
-            *(
-                self.indices[self.command.field][k]
-                for k in match_keys
-                if k in self.indices[self.command.field]
-            )
-        )
+        if isinstance(target, str):
+            return 0
+
+        numeric_index = self.indices.numeric_ranges[self.command.field]
+        match self.command.operator:
+            case units.NumericOp.GT_E:
+                return numeric_index.above(target, inclusive=True)
+            case units.NumericOp.GT:
+                return numeric_index.above(target)
+            case units.NumericOp.LT_E:
+                return numeric_index.below(target, inclusive=True)
+            case units.NumericOp.LT:
+                return numeric_index.below(target)
+
+    def exclusion_lookup(self):
+        # every spell with a non-null value for the field, minus the matches
+        if self.command.field in SCAN_FIELDS:
+            population = self.candidates
+        else:
+            population = self.indices.populated[self.command.field]
+        return population & ~self.direct_lookup()
 
     def _extract_ratio(self, value):
-        value_lower = value.lower()
-
-        for category in ["self", "touch", "foot", "mile"]:
-            if value_lower in units.LENGTH_UNIT[category]["aliases"]:
-                return units.LENGTH_UNIT[category]["ratio"]
-
-        for category in [
-            "instantaneous",
-            "second",
-            "minute",
-            "hour",
-            "day",
-            "year",
-            "dnd_economy",
-            "until_dispelled",
-        ]:
-            if value_lower in units.TIME_UNIT[category]["aliases"]:
-                return units.TIME_UNIT[category]["ratio"]
-
-        return value
+        # values are lowercased at validation
+        return UNIT_RATIOS.get(value, value)
 
     def applying_NOT_ANY_modifier(self, pre_result):
         if self.command.modifier == "NOT":
             if len(self.command.values) == 0:
-                all_field_values = set().union(
-                    *(self.indices[self.command.field].values())
-                )
-                return set(self.spells.keys()) - all_field_values
-            return set(self.spells.keys()) - pre_result
+                all_field_values = self.indices.any_value(self.command.field)
+                return self.candidates & ~all_field_values
+            return self.candidates & ~pre_result
         if self.command.modifier == "ANY":
-            if self.command.rules.not_any:
-                return set().union(*(self.indices[self.command.field].values()))
-            else:
-                raise ValueError(
-                    f"'*' modifier incompatible with '{self.command.field}' searches"
-                )
+            return self.indices.any_value(self.command.field)
         return pre_result
@@ -0,0 +1,116 @@
+# prebuilt spells + indices in one binary file, so a cold start is a single read
+# build it pre-deploy, from the repo root: python -m src.search.snapshot_handler
+import hashlib
+import importlib.util
+import json
+import logging
+import mmap
+import pickle
+import struct
+
+from src.search.index_handler import CATALOG_VERSIONS
+
+logger = logging.getLogger(__name__)
+
+SPELLS_JSON: str = "src/data/FINAL_spells.json"
+SNAPSHOT_PATH: str = "src/data/catalog.snapshot"
+
+MAGIC: bytes = b"DNDFALL\x00"
+# bump when the snapshot layout itself changes
+SNAPSHOT_FORMAT: int = 2
+# magic, format, source digest, payload digest, spells length, indices length;
+# spells and indices are pickled apart, so the spells can be loaded on their own
+HEADER: struct.Struct = struct.Struct("<8sI32s32sQQ")
+
+# the pickled classes, and the code deciding what gets built (fields, sort fields,
+# create_indices); a change to any of them makes snapshots stale. By name, since
+# orchestration imports this module
+SNAPSHOT_MODULES: tuple = (
+    "src.specs.schema",
+    "src.specs.units",
+    "src.search",
+    "src.search.column_handler",
+    "src.search.command_handler",
+    "src.search.index_handler",
+    "src.orchestration",
+)
+
+
+def source_digest(json_path: str):
+    """What a snapshot was built from: the spell JSON plus the indexing code."""
+    digest = hashlib.sha256()
+    modules: list = [importlib.util.find_spec(name).origin for name in SNAPSHOT_MODULES]
+    for path in (json_path, *modules):
+        with open(file=path, mode="rb") as source:
+            digest.update(source.read())
+    return digest.digest()
+
+
+def write_snapshot(snapshot_path: str, json_path: str, spells: dict, indices):
+    pickled_spells: bytes = pickle.dumps(spells, protocol=pickle.HIGHEST_PROTOCOL)
+    pickled_indices: bytes = pickle.dumps(indices, protocol=pickle.HIGHEST_PROTOCOL)
+    payload: bytes = pickled_spells + pickled_indices
+    header: bytes = HEADER.pack(
+        MAGIC,
+        SNAPSHOT_FORMAT,
+        source_digest(json_path),
+        hashlib.sha256(payload).digest(),
+        len(pickled_spells),
+        len(pickled_indices),
+    )
+    with open(file=snapshot_path, mode="wb") as snapshot:
+        snapshot.write(header + payload)
+
+
+def read_snapshot(snapshot_path: str, json_path: str, with_indices: bool = True):
+    """(spells, indices) from a snapshot, or None if it's missing, stale or corrupt.
+
+    With with_indices=False the indices aren't unpickled, and come back as None.
+    """
+    try:
+        with (
+            open(file=snapshot_path, mode="rb") as snapshot,
+            mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        ):
+            magic, version, source, checksum, *lengths = HEADER.unpack_from(mapped)
+            if magic != MAGIC or version != SNAPSHOT_FORMAT:
+                logger.info(
+                    "%s is not a format %d snapshot", snapshot_path, SNAPSHOT_FORMAT
+                )
+                return None
+            if source != source_digest(json_path):
+                logger.info(
+                    "%s is stale, %s or the code changed", snapshot_path, json_path
+                )
+                return None
+            length: int = sum(lengths)
+            with memoryview(mapped)[HEADER.size : HEADER.size + length] as payload:
+                if len(payload) != length:
+                    logger.warning("%s is truncated", snapshot_path)
+                    return None
+                if hashlib.sha256(payload).digest() != checksum:
+                    logger.warning("%s fails its checksum", snapshot_path)
+                    return None
+                spells: dict = pickle.loads(payload[: lengths[0]])
+                if not with_indices:
+                    return spells, None
+                indices = pickle.loads(payload[lengths[0] :])
+    except FileNotFoundError:
+        logger.info("no snapshot at %s", snapshot_path)
+        return None
+    except Exception:
+        # unreadable, or pickled by incompatible code: rebuild instead
+        logger.warning("can't read %s, rebuilding", snapshot_path, exc_info=True)
+        return None
+    # fresh version, so caches never mistake it for a catalog built in this process
+    indices.version = next(CATALOG_VERSIONS)
+    return spells, indices
+
+
+if __name__ == "__main__":
+    from src.orchestration import create_indices, spell_objects_from_JSON
+
+    with open(file=SPELLS_JSON, mode="r") as spell_JSON:
+        spells: dict = spell_objects_from_JSON(json.load(spell_JSON))
+    write_snapshot(SNAPSHOT_PATH, SPELLS_JSON, spells, create_indices(spells))
+    print(f"wrote {SNAPSHOT_PATH} ({len(spells)} spells)")
@@ -0,0 +1,58 @@
+from src.search.cache_handler import QueryCache
+
+# below this many values, one C-level `in` per value beats a Python automaton pass
+MATCHER_MIN_VALUES: int = 16
+
+MATCHER_CACHE: QueryCache = QueryCache(maxsize=256)
+
+
+# Aho-Corasick: every value found in a text in one pass over it, however many
+class SubstringMatcher:
+    def __init__(self, values):
+        goto: list[dict[str, int]] = [{}]
+        self.found: list[frozenset] = [frozenset()]
+        for value in values:
+            state: int = 0
+            for char in value:
+                if char not in goto[state]:
+                    goto.append({})
+                    self.found.append(frozenset())
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            self.found[state] |= {value}
+
+        # full transition table, failure links folded in, breadth first so each
+        # state's fallback is complete before its children copy it
+        self.transitions: list[dict[str, int]] = [dict(goto[0])] + [{}] * (
+            len(goto) - 1
+        )
+        queue: list[tuple[int, int]] = [(child, 0) for child in goto[0].values()]
+        for state, fallback in queue:
+            self.found[state] |= self.found[fallback]
+            self.transitions[state] = self.transitions[fallback] | goto[state]
+            for char, child in goto[state].items():
+                queue.append((child, self.transitions[fallback].get(char, 0)))
+
+    def find_each(self, texts):
+        """(i, values found in texts[i]), for every text with at least one."""
+        transitions: list = self.transitions
+        found: list = self.found
+        for i, text in enumerate(texts):
+            state: int = 0
+            matches: set = set()
+            for char in text:
+                state = transitions[state].get(char, 0)
+                if found[state]:
+                    matches |= found[state]
+            if matches:
+                yield i, matches
+
+
+def matcher(values):
+    """Compiled once per distinct value set, e.g. desc:(fire cold acid ...)."""
+    key: tuple = tuple(sorted(values))
+    compiled: SubstringMatcher | None = MATCHER_CACHE.get(key)
+    if compiled is None:
+        compiled = SubstringMatcher(key)
+        MATCHER_CACHE.put(key, None, compiled)
+    return compiled
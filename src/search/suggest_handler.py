@@ -0,0 +1,133 @@
+from collections import defaultdict
+from dataclasses import dataclass
+
+from src.search.query_handler import OPERATOR_RUN, WORD_RUN
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    term: str  # what the last query term completes to, e.g. "dt:" or "dt:fire"
+    count: int  # spells matched by the completed field or value
+    kind: str  # "field", "value" or "name"
+
+
+# every prefix of every key maps to its best completions, ranked once at build
+# time, so a lookup is a single dict get on the typed prefix
+class PrefixIndex:
+    def __init__(self, entries: list[tuple[str, Suggestion]], top: int = 10):
+        # one entry per completed term, e.g. names that differ only in case
+        unique: dict[str, tuple[str, Suggestion]] = {}
+        for key, suggestion in entries:
+            unique.setdefault(suggestion.term, (key, suggestion))
+        ranked: dict[str, list] = defaultdict(list)
+        for key, suggestion in unique.values():
+            for i in range(len(key) + 1):
+                ranked[key[:i]].append((key, suggestion))
+        self.completions: dict[str, list[Suggestion]] = {
+            prefix: [
+                suggestion
+                for _, suggestion in sorted(
+                    matches, key=lambda match: (-match[1].count, match[0])
+                )[:top]
+            ]
+            for prefix, matches in ranked.items()
+        }
+
+    def complete(self, prefix: str):
+        return self.completions.get(prefix.lower(), [])
+
+
+# completions for the term being typed: field aliases and spell names, or the
+# values of its field once an operator is in, e.g. "dt:fi" -> "dt:fire"
+class QuerySuggestions:
+    def __init__(self, indices, fields):
+        self.version: int = indices.version
+        self.fields: dict = {}
+        alias_entries: list = []
+        # -dt/*dt style terms, for fields that take NOT and ANY on their own
+        modifier_entries: list = []
+        value_indexes: dict = {}
+        for field in fields:
+            count: int = (
+                len(indices.ids)
+                if field.name not in indices.populated
+                else indices.populated[field.name].bit_count()
+            )
+            for alias in field.aliases:
+                self.fields[alias] = field.name
+                alias_entries.append((alias, Suggestion(alias + ":", count, "field")))
+                if field.not_any:
+                    modifier_entries.append((alias, Suggestion(alias, count, "field")))
+            value_indexes[field.name] = PrefixIndex(
+                [
+                    (
+                        str(value).lower(),
+                        Suggestion(
+                            str(value).lower(),
+                            indices.postings[field.name].get(value, 0).bit_count(),
+                            "value",
+                        ),
+                    )
+                    for value in field.values
+                ]
+            )
+        self.aliases: PrefixIndex = PrefixIndex(alias_entries)
+        self.modifier_aliases: PrefixIndex = PrefixIndex(modifier_entries)
+        self.values: dict[str, PrefixIndex] = value_indexes
+        self.names: PrefixIndex = PrefixIndex(
+            [
+                (
+                    name.lower(),
+                    Suggestion(
+                        name_term(name.lower()),
+                        # the term is a substring search, e.g. "fireball" also
+                        # matches "delayed blast fireball"
+                        indices.name_grams.match(name.lower()).bit_count(),
+                        "name",
+                    ),
+                )
+                for name in indices.ids
+            ]
+        )
+
+    def suggest(self, term: str, limit: int = 8):
+        """Completions for a single term, best first; modifiers are kept as typed."""
+        modifier: str = term[:1] if term[:1] in ("-", "*") else ""
+        word = WORD_RUN.match(term, len(modifier))
+        operator = word and OPERATOR_RUN.match(term, word.end())
+        if operator:
+            field_name: str | None = self.fields.get(word.group().lower())
+            if field_name is None:
+                return []
+            head: str = term[: operator.end()]
+            return [
+                Suggestion(head + s.term, s.count, s.kind)
+                for s in self.values[field_name].complete(term[operator.end() :])
+            ][:limit]
+
+        prefix: str = term[len(modifier) :]
+        aliases: PrefixIndex = self.modifier_aliases if modifier else self.aliases
+        fields: list = [
+            Suggestion(modifier + s.term, s.count, s.kind)
+            for s in aliases.complete(prefix)
+        ]
+        # -"fire bolt" is a negated name search (bare -fire would be a field),
+        # "*" only applies to fields
+        names: list = [
+            Suggestion(
+                modifier + quoted(s.term) if modifier else s.term, s.count, s.kind
+            )
+            for s in self.names.complete(prefix)
+            if modifier != "*"
+        ]
+        return (fields + names)[:limit]
+
+
+def name_term(name: str):
+    # one word stays bare; anything else (spaces, "-", "/", "'") as a quoted
+    # phrase, which searches it as a single name
+    return name if WORD_RUN.fullmatch(name) else quoted(name)
+
+
+def quoted(term: str):
+    return term if term.startswith('"') else f'"{term}"'
@@ -1,4 +1,5 @@
 import re
+import sys
 from enum import StrEnum
 from dataclasses import dataclass, field
 
@@ -22,6 +23,17 @@ class NormalizedSpell:
     url: str
     srd_flag: bool
     tags: dict[str, dict | list[str] | bool]
+    # normalized once here, so indexing and searching never redo it per spell
+    name_lower: str = field(init=False)
+    description_text: str = field(init=False)
+    class_tuple: tuple[str, ...] = field(init=False)
+
+    def __post_init__(self):
+        self.name_lower = self.name.lower()
+        self.description_text = " ".join(" ".join(self.description).split()).lower()
+        self.class_tuple = tuple(
+            sys.intern(value.lower().strip()) for value in self.classes.split(",")
+        )
 
     def extract_index_info(self):
         index_info = {
@@ -33,7 +45,7 @@ class NormalizedSpell:
             "gp_cost": {self.tags["gp_cost"]},
             "duration": {self.tags["duration"]},
             "casting_time": {self.tags["casting_time"]},
-            "classes": {value.lower().strip() for value in self.classes.split(",")},
+            "classes": set(self.class_tuple),
             "upcast": {self.higher_level},
             "condition": {
                 value for value in self.tags["condition"] if value is not None
@@ -80,6 +92,165 @@ class NormalizedSpell:
         return index_info
 
 
+# same spell, compact: slots instead of a per-instance __dict__, read-only, and
+# tags flattened into fields and small tuples instead of nested dicts and lists
+@dataclass(frozen=True)
+class SpellRecord:
+    __slots__ = (
+        "name",
+        "level",
+        "concentration",
+        "ritual",
+        "school",
+        "range",
+        "components",
+        "duration",
+        "casting_time",
+        "classes",
+        "higher_level",
+        "higher_description",
+        "description",
+        "url",
+        "srd_flag",
+        "range_feet",
+        "gp_cost",
+        "duration_seconds",
+        "casting_time_seconds",
+        "conditions",
+        "saving_throws",
+        "aoe",
+        "base_damage",
+        "damage_at_slot",
+        "damage_at_level",
+        "name_lower",
+        "description_text",
+        "class_tuple",
+    )
+    name: str
+    level: int
+    concentration: bool
+    ritual: bool
+    school: str
+    range: str
+    components: str
+    duration: str
+    casting_time: str
+    classes: str
+    higher_level: str | bool
+    higher_description: str | bool
+    description: tuple[str, ...]
+    url: str
+    srd_flag: bool
+    # tags
+    range_feet: float | None
+    gp_cost: float | None
+    duration_seconds: float | None
+    casting_time_seconds: float | None
+    conditions: tuple[str, ...]
+    saving_throws: tuple[str, ...]
+    aoe: tuple[tuple[float | None, str | None], ...]  # (size, shape)
+    # (damage types, average, maximum) per base damage
+    base_damage: tuple[tuple[tuple, float, float], ...]
+    damage_at_slot: tuple | None
+    damage_at_level: tuple | None
+    # as in NormalizedSpell
+    name_lower: str
+    description_text: str
+    class_tuple: tuple[str, ...]
+
+    @classmethod
+    def from_spell(cls, spell: NormalizedSpell):
+        tags: dict = spell.tags
+        return cls(
+            name=spell.name,
+            level=spell.level,
+            concentration=spell.concentration,
+            ritual=spell.ritual,
+            school=spell.school,
+            range=spell.range,
+            components=spell.components,
+            duration=spell.duration,
+            casting_time=spell.casting_time,
+            classes=spell.classes,
+            higher_level=spell.higher_level,
+            higher_description=spell.higher_description,
+            description=tuple(spell.description),
+            url=spell.url,
+            srd_flag=spell.srd_flag,
+            range_feet=tags["range"],
+            gp_cost=tags["gp_cost"],
+            duration_seconds=tags["duration"],
+            casting_time_seconds=tags["casting_time"],
+            conditions=tuple(v for v in tags["condition"] if v is not None),
+            saving_throws=tuple(v for v in tags["saving_throw"] if v is not None),
+            aoe=tuple((area["aoe_size"], area["aoe_shape"]) for area in tags["aoe"]),
+            base_damage=tuple(
+                (
+                    tuple(dt["damage_type"])
+                    if isinstance(dt["damage_type"], list)
+                    else (dt["damage_type"],),
+                    dt["damage_average"],
+                    dt["damage_maximum"],
+                )
+                for dt in tags["damage"]["base_damage"]
+                if dt is not None
+            ),
+            damage_at_slot=_frozen(tags["damage"]["damage_at_slot"]),
+            damage_at_level=_frozen(tags["damage"]["damage_at_level"]),
+            name_lower=spell.name_lower,
+            description_text=spell.description_text,
+            class_tuple=spell.class_tuple,
+        )
+
+    # no instance __dict__ with slots; this keeps SPELLS[name].__dict__ working
+    @property
+    def __dict__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    # frozen slots need explicit pickling, e.g. for st.cache_data
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple):
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
+
+    def extract_index_info(self):
+        # same values as NormalizedSpell.extract_index_info
+        return {
+            "level": {self.level},
+            "concentration": {self.concentration},
+            "ritual": {self.ritual},
+            "school": {self.school.lower()},
+            "range": {self.range_feet},
+            "gp_cost": {self.gp_cost},
+            "duration": {self.duration_seconds},
+            "casting_time": {self.casting_time_seconds},
+            "classes": set(self.class_tuple),
+            "upcast": {self.higher_level},
+            "condition": set(self.conditions),
+            "saving_throw": set(self.saving_throws),
+            "aoe_size": {size for size, _ in self.aoe if size is not None},
+            "aoe_shape": {shape for _, shape in self.aoe if shape is not None},
+            "damage_type": {
+                damage_type
+                for damage_types, _, _ in self.base_damage
+                for damage_type in damage_types
+            },
+            "damage_average": {sum(average for _, average, _ in self.base_damage)},
+            "damage_maximum": {sum(maximum for _, _, maximum in self.base_damage)},
+        }
+
+
+def _frozen(value):
+    # nested dicts and lists -> tuples, so records stay hashable and compact
+    if isinstance(value, dict):
+        return tuple((k, _frozen(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return value
+
+
 @dataclass
 class NormalizedMonster:
     name: str
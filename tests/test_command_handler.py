@@ -0,0 +1,55 @@
+import pytest
+
+from src.orchestration import compile_query
+
+
+@pytest.mark.parametrize(
+    ("query", "grouped", "field", "descending"),
+    [
+        ("l:1 OR l:2 order:level", "(l:1 OR l:2) order:level", "level", False),
+        ("order:level l:1 OR l:2", "(l:1 OR l:2) order:level", "level", False),
+        (
+            "dt:fire OR dt:cold dir:desc",
+            "(dt:fire OR dt:cold) dir:desc",
+            "spell_name",
+            True,
+        ),
+    ],
+)
+def test_directives_next_to_or(query, grouped, field, descending):
+    key, _, sort, explain = compile_query(query)
+    assert key == compile_query(grouped)[0]
+    assert (sort.field, sort.descending, explain) == (field, descending, False)
+
+
+def test_explain_next_to_or():
+    key, _, _, explain = compile_query("l:1 OR l:2 explain:true")
+    assert explain
+    assert key == compile_query("l:1 OR l:2")[0]
+
+
+def test_directive_alone_in_an_or_branch():
+    key, _, sort, _ = compile_query("l:1 OR order:level")
+    assert key == compile_query("l:1")[0]
+    assert sort.field == "level"
+
+
+def test_quoted_description_word_is_exact():
+    _, quoted, _, _ = compile_query('desc:"fire"')
+    _, bare, _, _ = compile_query("desc:fire")
+    assert next(quoted.commands()).values == {'"fire"'}
+    assert next(bare.commands()).values == {"fire"}
+
+
+def test_quoted_values_elsewhere_are_plain():
+    _, expression, _, _ = compile_query('school:"evocation" "fire bolt"')
+    assert {c.values for c in expression.commands()} == {
+        frozenset({"evocation"}),
+        frozenset({"fire bolt"}),
+    }
+
+
+def test_lowercase_or_is_part_of_names():
+    _, expression, _, _ = compile_query("create or destroy water")
+    assert expression.operator == "AND"
+    assert len(expression.operands) == 4
@@ -0,0 +1,7 @@
+from src.search.index_handler import TokenIndex
+
+
+def test_quoted_word_matches_whole_words_only():
+    index: TokenIndex = TokenIndex.from_texts(["fireball", "fire bolt"])
+    assert index.match("fire") == 0b11
+    assert index.match('"fire"') == 0b10
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from src.search.index_handler import TokenIndex
+from src.search.query_handler import QueryParsing
+from src.search.regex_handler import REGEX_BUDGET, RegexTimeout, compile_regex
+
+# ~1.7k characters, about the longest real descriptions
+LONG_TEXTS: list[str] = ["e" * 1700] * 50
+
+
+def test_refuses_nested_repeats():
+    with pytest.raises(ValueError, match="nests repeats"):
+        compile_regex("/(e+)+!/")
+
+
+@pytest.mark.parametrize(
+    "value", [r"/\d+d\d+ fire/", r"/\w+ \w+/", "/fire.*cold.*acid/"]
+)
+def test_accepts_everyday_patterns(value):
+    assert compile_regex(value)
+
+
+def test_runaway_pattern_times_out():
+    # the alternation hides every literal, so no prefilter narrows it either
+    index: TokenIndex = TokenIndex.from_texts(LONG_TEXTS)
+    pattern = compile_regex("/(?:e|t).*.*.*.*!/")
+    with pytest.raises(RegexTimeout):
+        index.regex(pattern, deadline=time.perf_counter() + REGEX_BUDGET)
+
+
+def test_pattern_within_budget():
+    index: TokenIndex = TokenIndex.from_texts(["2d6 fire damage", "1d8 cold", "fire"])
+    pattern = compile_regex(r"/\d+d\d+ fire/")
+    assert index.regex(pattern, deadline=time.perf_counter() + 10) == 0b001
+
+
+def test_regex_inside_value_list():
+    parsed = QueryParsing("desc:(/fi re/ cold)").parse_query()
+    assert parsed[0].values == ["/fi re/", "cold"]
@@ -0,0 +1,15 @@
+from src.search.suggest_handler import PrefixIndex, Suggestion, name_term
+
+
+def test_names_differing_in_case_complete_once():
+    names: list = ["Commune With Nature", "Commune with Nature", "Command"]
+    index: PrefixIndex = PrefixIndex(
+        [
+            (name.lower(), Suggestion(name_term(name.lower()), 1, "name"))
+            for name in names
+        ]
+    )
+    assert [s.term for s in index.complete("co")] == [
+        "command",
+        '"commune with nature"',
+    ]